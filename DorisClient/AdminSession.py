@@ -18,22 +18,90 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import os
 import re
+import json
 import math
+import hashlib
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from .BaseSession import DorisSession, Logger
+from ._Ddl import parse_ddl, replace_distribution, remove_properties
+from ._BaseSql import MetaSql_partition_size
 
 log = Logger(name=__name__)
 
+# seconds a worker of a check / chunked copy waits for a pooled connection before its work runs on the calling thread
+WORKER_ACQUIRE_TIMEOUT = 10
+_STARVED = object()
+
+
+class BucketPolicy:
+    """
+    sizing rules of `DorisAdmin.advise`, subclass it and override `buckets` for other rules
+
+        BucketPolicy(bucket_bytes=1024 ** 3, min_buckets=2, max_buckets=64, power_of_two=True, max_key_skew=0.5)
+    """
+
+    def __init__(self, bucket_bytes=524288000, min_buckets=1, max_buckets=None, power_of_two=False, tolerance=2.0,
+                 min_bytes=0, max_key_skew=None):
+        """
+        :param bucket_bytes: data bytes (one replica) of one bucket, default 500M
+        :param min_buckets: fewest buckets recommended
+        :param max_buckets: most buckets recommended, default None (no limit)
+        :param power_of_two: round a recommended count up to a power of two
+        :param tolerance: plan a partition when its buckets are more than tolerance times off the recommended count
+        :param min_bytes: never plan a partition smaller than min_bytes
+        :param max_key_skew: plan a partition whose key skew is above max_key_skew, default None (buckets only)
+        """
+        assert bucket_bytes > 0 and min_buckets >= 1 and tolerance >= 1, 'invalid BucketPolicy'
+        self.bucket_bytes = bucket_bytes
+        self.min_buckets = min_buckets
+        self.max_buckets = max_buckets
+        self.power_of_two = power_of_two
+        self.tolerance = tolerance
+        self.min_bytes = min_bytes
+        self.max_key_skew = max_key_skew
+
+    def buckets(self, size):
+        """
+        recommended bucket count of size bytes
+        """
+        buckets = max(math.ceil(size / self.bucket_bytes), self.min_buckets)
+        if self.power_of_two:
+            buckets = 1 << (buckets - 1).bit_length()
+        if self.max_buckets:
+            buckets = min(buckets, self.max_buckets)
+        return buckets
+
+    def off(self, current, recommended):
+        """
+        whether the current bucket count is out of tolerance
+        """
+        return not recommended / self.tolerance <= current <= recommended * self.tolerance
+
 
 class DorisAdmin(DorisSession):
 
-    def get_buckets(self, database_name, table_name, partition_name):
+    def get_size(self, database_name, table_name, partition_name=None):
+        """
+        data size in bytes of a table or partition (one replica), from `show tablets`
+        """
         sql = f'show tablets from `{database_name}`.`{table_name}`'
         if partition_name:
             sql += f' partition `{partition_name}`'
-        rows = self.read(sql)
-        items = { row['TabletId']: int(row.get('LocalDataSize', row.get('DataSize'))) for row in rows }
-        size = sum(items.values())
+
+        def tablets_size():
+            rows = self.read(sql)
+            items = { row['TabletId']: int(row.get('LocalDataSize', row.get('DataSize'))) for row in rows }
+            return sum(items.values())
+
+        return self._cached(f'tablets_size:{database_name}.{table_name}:{partition_name or ""}', tablets_size,
+                            database_name, table_name)
+
+    def get_buckets(self, database_name, table_name, partition_name):
+        size = self.get_size(database_name, table_name, partition_name)
         buckets = math.ceil(size / 524288000)  # Add one bucket for every 500M
         return buckets
 
@@ -43,7 +111,7 @@ class DorisAdmin(DorisSession):
         where table_schema = '{database_name}' 
         and table_name = '{table_name}'
         """
-        column_str = self.read(sql)[0]['column_str']
+        column_str = self.read(sql)[0]['column_str']  # never cached, an added column must reach the new table
         if mock_seq_column is not None:
             target_column = f"{column_str}, __DORIS_SEQUENCE_COL__"
             select_column = f"{column_str}, '{mock_seq_column}' as __DORIS_SEQUENCE_COL__"
@@ -51,24 +119,71 @@ class DorisAdmin(DorisSession):
         else:
             return column_str, column_str
 
-    def check(self, log_name, table_name, partition_name=None):
+    def check(self, log_name, table_name, partition_name=None, database_name=None, workers=4, fingerprint=False,
+              stop_on_mismatch=True):
+        """
+        compare a table with its `_tmp` table partition by partition, or a partition with its `_tmp` temporary
+        partition, the counts of both sides run at the same time, `workers` queries at a time on their own connections
+        (see `_parallel`)
+
+        param database_name: default None, the current database
+        param fingerprint: also compare sum(murmur_hash3_32(row)) over all columns, or over a list of columns
+        param stop_on_mismatch: skip the partitions not checked yet once one differs
+        return: [{partition, rows, tmp_rows, fingerprint, tmp_fingerprint}] of every partition checked,
+            raise when a partition differs
+        """
+        database_name = database_name or self.read('select database() as db')[0]['db']
+        src, tmp = f'`{database_name}`.`{table_name}`', f'`{database_name}`.`{table_name}_tmp`'
         if partition_name:
-            tb = f'`{table_name}` partition `{partition_name}`'
-            tb_tmp = f'`{table_name}` temporary partition {partition_name}_tmp'
-        else:
-            tb, tb_tmp = f'`{table_name}`', f'{table_name}_tmp'
-        sql = f"""
-        select distinct ct
-        from(
-        select count(1) as ct from {tb}
-        union all select count(1) as ct from {tb_tmp}
-        ) s 
-        """
-        if len(self.read(sql)) == 1:
-            log.info(f'【{log_name}】check pass ...')
+            units = {partition_name: (f'{src} partition `{partition_name}`',
+                                      f'{src} temporary partition `{partition_name}_tmp`')}
         else:
-            log.error(f'【{log_name}】check fail \n{sql} !!!')
-            raise Exception
+            rows = self.read(f'show partitions from {src}')
+            if any(row.get('PartitionKey') for row in rows):
+                units = {row['PartitionName']: (f"{src} partition `{row['PartitionName']}`",
+                                                f"{tmp} partition `{row['PartitionName']}`") for row in rows}
+            else:
+                units = {table_name: (src, tmp)}
+        select = 'count(1) as ct'
+        if fingerprint:
+            columns = fingerprint if isinstance(fingerprint, (list, tuple)) else \
+                self.get_columns(database_name, table_name, None)[0].split(',')
+            # NULL and '' hash differently, concat_ws would skip a NULL
+            row = ", ".join(f"ifnull(cast(`{column.strip()}` as string), '\\\\N')" for column in columns)
+            select += f", sum(murmur_hash3_32(concat_ws('|', {row}))) as fp"
+
+        stop = threading.Event()
+
+        def count(job):
+            if stop.is_set():
+                return None
+            unit, side = job
+            return self.read(f'select {select} from {units[unit][side]}')[0]
+
+        results, report, differ = {}, [], []
+        jobs = [(unit, side) for unit in units for side in (0, 1)]
+        counts = self._parallel(count, jobs, workers, 'DorisAdmin-check')
+        for (unit, side), result in counts:
+            results.setdefault(unit, {})[side] = result
+            if len(results[unit]) < 2:
+                continue
+            a, b = results[unit][0], results[unit][1]
+            item = {'partition': unit, 'rows': a['ct'], 'tmp_rows': b['ct'],
+                    'fingerprint': a.get('fp'), 'tmp_fingerprint': b.get('fp')}
+            report.append(item)
+            if (a['ct'], a.get('fp')) != (b['ct'], b.get('fp')):
+                differ.append(item)
+                log.error(f"【{log_name}】{unit} differ, {item['rows']} rows >> {item['tmp_rows']} rows"
+                          + (f", fingerprint {item['fingerprint']} >> {item['tmp_fingerprint']}" if fingerprint else ''))
+                if stop_on_mismatch:
+                    stop.set()
+                    break
+        counts.close()  # cancel the counts not started yet
+        if differ:
+            raise Exception(f"【{log_name}】check fail, {len(differ)} partitions differ: "
+                            f"{', '.join(item['partition'] for item in differ)} !!!")
+        log.info(f'【{log_name}】check pass, {len(report)} partitions ...')
+        return report
 
     def modify(self, **kwargs):
         """
@@ -91,7 +206,24 @@ class DorisAdmin(DorisSession):
                                  the "INSERT INTO tb2 SELECT * FROM tb1 " query may still result in an error.
                                  In this case, you may need to mock the sequence column
                                  default none, eg: '0', '1970-01-01'
+            chunked              default False, copy a whole table partition by partition,
+                                 or a group of tablets at a time when it is not partitioned
+            copy_workers         default 4, chunks copied at the same time, each on its own connection,
+                                 at most the free connections of the pool
+            chunk_tablets        default 32, tablets of a chunk of a not partitioned table
+            checkpoint_dir       default none, finished chunks are kept in {checkpoint_dir}/{database_name}.{table_name}.json,
+                                 a rerun after a failure skips them
+            check_workers        default 4, partitions counted at the same time when checking the new table
+            fingerprint          default False, also compare a hash of all columns when checking the copy
         """
+        with self.pin():  # `use database_name` must stay on one connection
+            try:
+                return self._modify(**kwargs)
+            finally:
+                if self.meta_cache is not None:
+                    self.meta_cache.invalidate(kwargs.get('database_name'), kwargs.get('table_name'))
+
+    def _modify(self, **kwargs):
         database_name = kwargs.get('database_name')
         table_name = kwargs.get('table_name')
         partition_name = kwargs.get('partition_name')
@@ -106,10 +238,12 @@ class DorisAdmin(DorisSession):
             assert isinstance(buckets, int), '`buckets` only accept int value !!!'
         # get old config
         self.execute(f'use {database_name};')
+        # read live, not through meta_cache: an ALTER TABLE does not change the version the cache is bound to,
+        # and the new table built from this ddl replaces the old one
         ddl = self.read(f"show create table `{table_name}`")[0]['Create Table']
-        old_distribution_key = re.findall('DISTRIBUTED BY (.*?) BUCKETS', ddl)[0]
-        old_distribution_key = re.sub('`|\(|\)|HASH| ', '', old_distribution_key)
-        old_buckets = re.findall('BUCKETS (\d+)', ddl)[0]
+        table = parse_ddl(ddl)
+        old_distribution_key = ','.join(table.distribution_key) or table.distribution_type
+        old_buckets = table.buckets or 0  # 0 for BUCKETS AUTO
         if partition_name:
             rows = self.read(f"show partitions from `{table_name}` where PartitionName='{partition_name}'")
             if rows:
@@ -152,35 +286,47 @@ class DorisAdmin(DorisSession):
                 distribution_key = old_distribution_key
             tmp_tb = f'{table_name}_tmp'
             tmp_ddl = ddl.replace(f'TABLE `{table_name}`', f'TABLE `{tmp_tb}`')
-            tmp_ddl = re.sub('DISTRIBUTED BY .*? BUCKETS \d+', f'DISTRIBUTED BY {distribution_key} BUCKETS {buckets}',tmp_ddl)
-            tmp_ddl = re.sub('"dynamic_partition.buckets" = "\d+"', f'"dynamic_partition.buckets" = "{buckets}"',tmp_ddl)
+            tmp_ddl = replace_distribution(tmp_ddl, distribution_key, buckets)
             if ignore_properties:
-                for ignore_property in ignore_properties.split(','):
-                    tmp_ddl = re.sub(f'"{ignore_property}" = ".*?",', '', tmp_ddl)
+                tmp_ddl = remove_properties(tmp_ddl, ignore_properties.split(','))
             if add_properties:
                 tmp_ddl = tmp_ddl.replace(');', f',{add_properties});')
+            checkpoint = self._checkpoint(database_name, table_name, kwargs.get('checkpoint_dir')) \
+                if kwargs.get('chunked') else None
+            if checkpoint and checkpoint['resumed']:  # the new table may have been created by the failed run
+                tmp_ddl = tmp_ddl.replace(f'TABLE `{tmp_tb}`', f'TABLE IF NOT EXISTS `{tmp_tb}`')
+            if checkpoint:
+                self._save_checkpoint(checkpoint)  # before the create, a rerun never meets a new table it ignores
             # 1.create new table
             log.info(f'【{log_name}】create table {tmp_tb} ...')
             self.execute(tmp_ddl)
             # 2.insert into new table
             target_column, select_column = self.get_columns(database_name, table_name, mock_seq_column)
-            insert_sql = f'insert into `{tmp_tb}`({target_column}) select {select_column} from `{table_name}`;'
-            log.info(f'【{log_name}】insert into {tmp_tb} ...')
-            self.execute(insert_sql)
+            if checkpoint:
+                self._copy_chunks(log_name, database_name, table_name, table, target_column, select_column,
+                                  checkpoint, kwargs.get('copy_workers', 4), kwargs.get('chunk_tablets', 32))
+            else:
+                insert_sql = f'insert into `{tmp_tb}`({target_column}) select {select_column} from `{table_name}`;'
+                log.info(f'【{log_name}】insert into {tmp_tb} ...')
+                self.execute(insert_sql)
             log.info(f'【{log_name}】check the number of records in two tables ...')
-            self.check(log_name, table_name)
+            self.check(log_name, table_name, database_name=database_name, workers=kwargs.get('check_workers', 4),
+                       fingerprint=kwargs.get('fingerprint', False))
             # 3.replace table with new table
             log.info(f'【{log_name}】replace {table_name} with {tmp_tb}...')
             replace_sql = f"alter table `{table_name}` replace with table `{tmp_tb}` properties('swap' = 'false');"
             self.execute(replace_sql)
+            if checkpoint and checkpoint['path']:
+                os.remove(checkpoint['path'])
             log.info(f'【{log_name}】({old_distribution_key} {old_buckets}) >> ({distribution_key} {buckets})')
             log.info(f'【{log_name}】changed success')
+            return True
         else:
             """
             single partition
             """
             tmp_partition = f"{partition_name}_tmp"
-            partition_values = re.findall(f'PARTITION {partition_name} (VALUES .*)[,|\)|\]]', ddl)[0].replace(partition_name, tmp_partition)
+            partition_values = table.partitions[partition_name].replace(partition_name, tmp_partition)
             # 1.create temp_partition
             tmp_ddl = f"alter table {table_name} add temporary partition {tmp_partition} {partition_values} DISTRIBUTED BY {old_distribution_key} BUCKETS {buckets}"
             log.info(f'【{log_name}】create temp_partition {tmp_partition} ...')
@@ -191,10 +337,331 @@ class DorisAdmin(DorisSession):
             log.info(f'【{log_name}】insert into {tmp_partition} ...')
             self.execute(insert_sql)
             log.info(f'【{log_name}】check the number of records in two partitions ...')
-            self.check(log_name, table_name, partition_name)
+            self.check(log_name, table_name, partition_name, database_name=database_name,
+                       fingerprint=kwargs.get('fingerprint', False))
             # 3.replace partition with the temp_partition
             log.info(f'【{log_name}】replace {partition_name} with {tmp_partition}...')
             replace_sql = f"alter table `{table_name}` replace partition `{partition_name}` with temporary partition `{tmp_partition}`;"
             self.execute(replace_sql)
             log.info(f'【{log_name}】({old_distribution_key} {old_buckets}) >> ({old_distribution_key} {buckets})')
-            log.info(f'【{log_name}】changed success')
\ No newline at end of file
+            log.info(f'【{log_name}】changed success')
+            return True
+
+    def _parallel(self, fn, items, workers, name):
+        """
+        yield (item, fn(item)) as they finish, `workers` at a time on pooled connections of their own
+
+        the calling thread may hold a pinned connection (modify) and other jobs (modify_many) hold theirs,
+        waiting for one of them to come back could hang forever: the workers are capped to the free connections
+        of the pool, and an item whose worker gets no connection in WORKER_ACQUIRE_TIMEOUT seconds runs on the
+        calling thread instead, as every item does when no connection is free
+        """
+        workers = min(workers, self._pool().free())
+        if workers < 1:
+            for item in items:
+                yield item, fn(item)
+            return
+        starved = threading.Event()
+
+        def run(item):
+            if starved.is_set():
+                return _STARVED
+            try:
+                with self.pin(WORKER_ACQUIRE_TIMEOUT):
+                    return fn(item)
+            except TimeoutError:
+                starved.set()
+                return _STARVED
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name) as executor:
+            futures = {executor.submit(run, item): item for item in items}
+            try:
+                for future in as_completed(futures):
+                    if future.cancelled():
+                        continue
+                    item, result = futures[future], future.result()
+                    yield item, (fn(item) if result is _STARVED else result)
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def _checkpoint(self, database_name, table_name, checkpoint_dir=None):
+        """
+        chunks copied by an earlier run of a chunked rebuild, {path, resumed, label, chunks: {chunk: {rows, elapsed}}}
+        """
+        path = os.path.join(os.path.expanduser(checkpoint_dir), f'{database_name}.{table_name}.json') \
+            if checkpoint_dir else None
+        if path and os.path.exists(path):
+            with open(path) as f:
+                checkpoint = json.load(f)
+            log.info(f"【{table_name}】resume from {path}, {len(checkpoint['chunks'])} chunks already copied")
+        else:
+            checkpoint = {'label': f"{int(time.time() * 1000):x}", 'chunks': {}}
+        checkpoint['path'], checkpoint['resumed'] = path, bool(path and os.path.exists(path))
+        return checkpoint
+
+    def _save_checkpoint(self, checkpoint):
+        if checkpoint['path']:
+            with open(checkpoint['path'] + '.tmp', 'w') as f:
+                json.dump({'label': checkpoint['label'], 'chunks': checkpoint['chunks']}, f, indent=2)
+            os.replace(checkpoint['path'] + '.tmp', checkpoint['path'])
+
+    def _chunks(self, database_name, table_name, table, chunk_tablets=32):
+        """
+        {chunk: (partition clause of the insert, from clause of the select)} of a whole table copy
+        """
+        src = f'`{database_name}`.`{table_name}`'
+        if table.partitions:
+            return {name: (f'partition(`{name}`)', f'{src} partition(`{name}`)') for name in table.partitions}
+        rows = self.read(f'show tablets from {src}')
+        tablets = sorted({int(row['TabletId']) for row in rows})
+        chunks = {}
+        for i in range(0, len(tablets), chunk_tablets):
+            ids = ','.join(str(tablet) for tablet in tablets[i:i + chunk_tablets])
+            chunks[f'tablets_{i // chunk_tablets}'] = ('', f'{src} TABLET({ids})')
+        return chunks
+
+    def _insert(self, sql):
+        """
+        execute an insert, return the number of rows loaded
+        """
+        with self._conn() as conn:
+            with conn.cursor() as cur:
+                rows = cur.execute(sql)
+                conn.commit()
+        return rows
+
+    def _copy_chunks(self, log_name, database_name, table_name, table, target_column, select_column, checkpoint,
+                     copy_workers=4, chunk_tablets=32):
+        """
+        copy a table into its `_tmp` table chunk by chunk, `copy_workers` chunks at a time (see `_parallel`)
+
+        every insert has a label made of the run and the chunk, an insert committed just before a crash is
+        not loaded twice by the rerun, and is checked like the others: a partition chunk must hold as many
+        rows in both tables, a tablet chunk must load as many rows as the source tablets hold
+        """
+        tmp_tb = f'`{database_name}`.`{table_name}_tmp`'
+        chunks = self._chunks(database_name, table_name, table, chunk_tablets)
+        todo = [chunk for chunk in chunks if chunk not in checkpoint['chunks']]
+        log.info(f'【{log_name}】insert into {table_name}_tmp, {len(todo)} of {len(chunks)} chunks to copy ...')
+
+        def copy(chunk):
+            start = time.time()
+            partition, source = chunks[chunk]
+            label = f"modify_{checkpoint['label']}_{hashlib.md5(f'{table_name}:{chunk}'.encode()).hexdigest()[:16]}"
+            insert_sql = f'insert into {tmp_tb} {partition} with label {label} ({target_column}) ' \
+                         f'select {select_column} from {source}'
+            try:
+                rows = self._insert(insert_sql)
+            except Exception as e:
+                if 'has already been used' not in str(e):
+                    raise
+                rows = None  # committed by the failed run
+                log.warning(f'【{log_name}】chunk {chunk} was loaded by the last run')
+            expected = self.read(f'select count(1) as ct from {source}')[0]['ct']
+            if partition:
+                rows = self.read(f'select count(1) as ct from {tmp_tb} {partition}')[0]['ct']
+            if rows is not None and rows != expected:
+                raise Exception(f'【{log_name}】chunk {chunk} check fail, {expected} rows in source, {rows} copied !!!')
+            return {'rows': expected, 'elapsed': round(time.time() - start, 3)}
+
+        for chunk, copied in self._parallel(copy, todo, copy_workers, 'DorisAdmin-copy'):
+            checkpoint['chunks'][chunk] = copied
+            self._save_checkpoint(checkpoint)
+            log.info(f"【{log_name}】chunk {chunk} copied, {copied['rows']} rows "
+                     f"【{len(checkpoint['chunks'])}/{len(chunks)}】")
+
+    def advise(self, policy=None, **kwargs):
+        """
+        Bucket plan of every table / partition, computed in one pass over meta_partition and meta_tablet
+        (run collect_partition and collect_tablet first) instead of one `show tablets` per partition
+
+        every partition is reported with:
+            size             data size in bytes (one replica)
+            current_buckets  bucket count now
+            buckets          recommended bucket count of the policy
+            tablet_skew      biggest tablet / mean tablet size, 1 when tablets are even
+            key_skew         std / mean tablet size, high when the distribution key spreads rows unevenly,
+                             None for RANDOM distribution
+            score            (|log2(current_buckets / buckets)| + key_skew) * log2(1 + size / policy.bucket_bytes),
+                             worst offenders first
+            reason           buckets, key_skew, or both
+
+        param policy: BucketPolicy, default BucketPolicy()
+        param **kwargs:
+            database_name    filter condition, default None
+            table_name       filter condition, default None
+        return: planned partitions sorted by score, modify / modify_many targets,
+            not partitioned tables are planned as a whole (without partition_name)
+        """
+        policy = policy or BucketPolicy()
+        filter = ' and '.join([f"{k}='{v}'" for k, v in kwargs.items() if v])
+        plan = []
+        for row in self.iter_read(MetaSql_partition_size.replace('1=1', filter or '1=1')):
+            size = int(row['size'] or 0)
+            if size < policy.min_bytes:
+                continue
+            tablets = int(row['tablets'] or 0)
+            current = int(row['buckets'] or 0)
+            buckets = policy.buckets(size)
+            mean = size / tablets if tablets else 0
+            tablet_skew = round(float(row['max_size'] or 0) / mean, 3) if mean else 1.0
+            key_skew = None if (row['distribution_key'] or '').upper() == 'RANDOM' else \
+                round(float(row['std_size'] or 0) / mean, 3) if mean else 0.0
+            reason = []
+            if policy.off(current, buckets):
+                reason.append('buckets')
+            if policy.max_key_skew is not None and key_skew is not None and key_skew > policy.max_key_skew:
+                reason.append('key_skew')
+            if not reason:
+                continue
+            mismatch = abs(math.log2(max(current, 1) / buckets))
+            score = (mismatch + (key_skew or 0)) * math.log2(1 + size / policy.bucket_bytes)
+            target = {'database_name': row['database_name'], 'table_name': row['table_name']}
+            if row['partition_key']:
+                target['partition_name'] = row['partition_name']
+            target.update({'buckets': buckets, 'size': size, 'current_buckets': current, 'tablets': tablets,
+                           'tablet_skew': tablet_skew, 'key_skew': key_skew, 'score': round(score, 3),
+                           'reason': ','.join(reason)})
+            plan.append(target)
+        plan.sort(key=lambda t: (-t['score'], -t['size']))
+        log.info(f"advise {len(plan)} tables / partitions to modify")
+        return plan
+
+    def select_targets(self, bucket_bytes=524288000, tolerance=2.0, min_bytes=0, **kwargs):
+        """
+        tables / partitions whose bucket count is more than `tolerance` times off one bucket per bucket_bytes,
+        biggest first, see `advise` for other sizing policies and the skew of every partition
+
+        param **kwargs:
+            database_name    filter condition, default None
+            table_name       filter condition, default None
+        return: modify_many targets, with `buckets` and `size`
+        """
+        policy = BucketPolicy(bucket_bytes=bucket_bytes, tolerance=tolerance, min_bytes=min_bytes)
+        targets = [{k: v for k, v in target.items() if k in ('database_name', 'table_name', 'partition_name',
+                                                             'buckets', 'size')}
+                   for target in self.advise(policy, **kwargs)]
+        return sorted(targets, key=lambda t: -t['size'])
+
+    def _target_key(self, target):
+        key = f"{target['database_name']}.{target['table_name']}"
+        return f"{key}:{target['partition_name']}" if target.get('partition_name') else key
+
+    def _drop_leftover(self, target):
+        """
+        drop the tmp table / temporary partition left by a rebuild interrupted by a crash
+        """
+        database_name, table_name = target['database_name'], target['table_name']
+        partition_name = target.get('partition_name')
+        if partition_name:
+            sql = f"alter table `{database_name}`.`{table_name}` drop temporary partition `{partition_name}_tmp`"
+        else:
+            sql = f"drop table if exists `{database_name}`.`{table_name}_tmp`"
+        try:
+            self.execute(sql)
+            log.warning(f"【{self._target_key(target)}】dropped leftover of an interrupted rebuild")
+        except Exception as e:
+            log.debug(f"【{self._target_key(target)}】no leftover to drop, {e}")
+
+    def _resumable(self, target, checkpoint_dir=None, chunked=False, **kwargs):
+        """
+        whether the rebuild of a target left a checkpoint to resume from instead of a leftover to drop
+        """
+        if target.get('partition_name') or not target.get('chunked', chunked):
+            return False
+        checkpoint_dir = target.get('checkpoint_dir', checkpoint_dir)
+        return bool(checkpoint_dir) and os.path.exists(
+            os.path.join(os.path.expanduser(checkpoint_dir), f"{target['database_name']}.{target['table_name']}.json"))
+
+    def modify_many(self, targets, max_jobs=4, max_bytes=None, state_file=None, **kwargs):
+        """
+        Run modify for many tables / partitions at the same time
+
+        param targets: list of modify kwargs, eg: [{'database_name': 'db', 'table_name': 'tb', 'partition_name': 'p1'}],
+            a target may carry its data `size` in bytes, otherwise it is read with `show tablets`
+        param max_jobs: rebuilds (insert into ... select) running at the same time, each on its own connection,
+            at most mysql_pool_size * fe - 1
+        param max_bytes: bytes of the tables / partitions being rebuilt at the same time, default None (no cap),
+            a target bigger than max_bytes runs alone
+        param state_file: json file of target results, finished targets are skipped when run again and the leftover
+            of a target interrupted by a crash is dropped before it is rebuilt
+        param **kwargs: modify kwargs for every target, eg: only_rebuild=True
+        return: list of {target, status (changed, skipped, failed), error, size, elapsed}
+        """
+        # every job pins a connection for its whole rebuild, keep one free for sizes, checks and copies
+        capacity = self._pool().capacity
+        if max_jobs >= capacity:
+            log.warning(f"max_jobs {max_jobs} >= {capacity} connections of the pool (mysql_pool_size * fe), "
+                        f"use {max(capacity - 1, 1)} jobs")
+            max_jobs = max(capacity - 1, 1)
+        state = {}
+        if state_file and os.path.exists(state_file):
+            with open(state_file) as f:
+                state = json.load(f)
+        cond = threading.Condition()
+        running = {'jobs': 0, 'bytes': 0}
+        results = []
+
+        def save(key, result):
+            with cond:
+                state[key] = result
+                if state_file:
+                    with open(state_file + '.tmp', 'w') as f:
+                        json.dump(state, f, indent=2, default=str)
+                    os.replace(state_file + '.tmp', state_file)
+
+        def run(key, target, size, interrupted):
+            start = time.time()
+            result = {'target': key, 'status': 'failed', 'error': None, 'size': size}
+            try:
+                if interrupted and not self._resumable(target, **kwargs):
+                    self._drop_leftover(target)
+                save(key, dict(result, status='running'))
+                result['status'] = 'changed' if self.modify(**{**kwargs, **target}) else 'skipped'
+            except Exception as e:
+                result['error'] = repr(e)
+                log.error(f"【{key}】modify fail, {e!r}")
+            finally:
+                result['elapsed'] = round(time.time() - start, 3)
+                try:
+                    save(key, result)
+                except Exception as e:
+                    log.error(f"【{key}】state not saved, {e!r}")
+                finally:
+                    with cond:  # the slot is given back whatever happened, or the scheduler waits forever
+                        running['jobs'] -= 1
+                        running['bytes'] -= size
+                        results.append(result)
+                        log.info(f"【{len(results)}/{len(todo)}】{key} {result['status']} in {result['elapsed']}s")
+                        cond.notify_all()
+
+        todo = []
+        for target in targets:
+            target = dict(target)
+            size = target.pop('size', None)
+            key = self._target_key(target)
+            status = state.get(key, {}).get('status')
+            if status in ('changed', 'skipped'):
+                log.info(f"【{key}】already {status}, skip")
+                continue
+            todo.append((key, target, size, status == 'running'))
+
+        with ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix='DorisAdmin') as executor:
+            for key, target, size, interrupted in todo:
+                if size is None:
+                    try:
+                        size = self.get_size(target['database_name'], target['table_name'],
+                                             target.get('partition_name'))
+                    except Exception as e:
+                        log.warning(f"【{key}】size unknown, {e!r}")
+                        size = 0
+                with cond:
+                    cond.wait_for(lambda: running['jobs'] < max_jobs and (
+                            not max_bytes or not running['jobs'] or running['bytes'] + size <= max_bytes))
+                    running['jobs'] += 1
+                    running['bytes'] += size
+                executor.submit(run, key, target, size, interrupted)
+        failed = [r for r in results if r['status'] == 'failed']
+        log.info(f"modify_many finished, {len(results) - len(failed)} done, {len(failed)} failed")
+        return results
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import time
+import asyncio
+import functools
+import pymysql
+from functools import wraps
+from .BaseSession import DorisSession, DorisLogger, LoadResult, NoAvailableBackend, _ChunkedLoad, retry_delay, \
+    retryable
+from ._Encoder import is_stream
+
+try:
+    import aiohttp
+except ImportError:  # pip install aiohttp
+    aiohttp = None
+
+try:
+    import aiomysql
+    from aiomysql import DictCursor
+except ImportError:  # pip install aiomysql
+    aiomysql = DictCursor = None
+
+
+def AsyncRetry(*args, **kwargs):
+    """
+    Retry for coroutine, same options as Retry, `exceptions` default: aiohttp client error and timeout,
+    and no fe available
+    """
+    max_retry = kwargs.get('max_retry', 3)
+    retry_diff_seconds = kwargs.get('retry_diff_seconds', 3)
+    backoff = kwargs.get('backoff', 2)
+    max_diff_seconds = kwargs.get('max_diff_seconds', 60)
+    jitter = kwargs.get('jitter', 0.5)
+    deadline = kwargs.get('deadline')
+    client_errors = (aiohttp.ClientError, asyncio.TimeoutError) if aiohttp else ()
+    exceptions = kwargs.get('exceptions', client_errors + (NoAvailableBackend,))
+
+    def warpp(func):
+        @wraps(func)
+        async def run(*args, **kwargs):
+            start = time.monotonic()
+            flag = error = None
+            for i in range(max_retry + 1):
+                if i > 0:
+                    seconds = retry_delay(i, retry_diff_seconds, backoff, max_diff_seconds, jitter)
+                    if deadline and time.monotonic() - start + seconds > deadline:
+                        DorisLogger.error(f"stop retrying, deadline {deadline} seconds exceeded")
+                        if error is not None:
+                            raise error
+                        break
+                    DorisLogger.warning(f"will retry after {seconds:.1f} seconds，retry times : {i}/{max_retry}")
+                    await asyncio.sleep(seconds)
+                try:
+                    flag, error = await func(*args, **kwargs), None
+                except exceptions as e:
+                    if i == max_retry:
+                        raise
+                    error = e
+                    DorisLogger.warning(f"{func.__name__} error, {e!r}")
+                    continue
+                if flag or not retryable(flag):
+                    return flag
+            return flag
+
+        return run
+
+    return warpp
+
+
+async def _aiter(blocks):
+    """
+    yield the blocks of a body generator, each one encoded (and read from its file) in the default executor
+    """
+    loop = asyncio.get_running_loop()
+    blocks, end = iter(blocks), object()
+    while True:
+        block = await loop.run_in_executor(None, next, blocks, end)
+        if block is end:
+            return
+        yield block
+
+
+class AsyncDorisSession(DorisSession):
+    """
+    asyncio version of DorisSession, `streamload`, `read` and `execute` are coroutines
+
+        async with AsyncDorisSession(**doris_cfg) as doris:
+            await doris.streamload('streamload_test', data)
+            rows = await doris.read('select 1')
+    """
+
+    def __init__(self, fe_servers, database, user, passwd, mysql_port=9030, max_concurrency=100,
+                 pool_minsize=1, pool_maxsize=10, connect_timeout=10, read_timeout=None,
+                 redirect_ttl=30, fe_fail_threshold=1, fe_probe_interval=5, metrics=None):
+        """
+        :param fe_servers: fe servers list, like: ['127.0.0.1:8030', '127.0.0.2:8030', '127.0.0.3:8030']
+        :param database:
+        :param user:
+        :param passwd:
+        :param mysql_port: port for sql client, default:9030
+        :param max_concurrency: max stream loads in flight at the same time, default:100
+        :param pool_minsize: min sql connections kept per fe, default:1
+        :param pool_maxsize: max sql connections per fe, sql go to the fe with the fewest connections in use, default:10
+        :param connect_timeout: http connect timeout seconds, default:10
+        :param read_timeout: http read timeout seconds, default:None (wait until doris responds)
+        :param redirect_ttl: seconds to reuse the be location resolved for a table, default:30,
+                             chunks loaded in parallel always ask the fe
+        :param fe_fail_threshold: consecutive failures before a fe is marked down, default:1
+        :param fe_probe_interval: seconds between background health probes of down fe, default:5
+        :param metrics: LoadMetrics fed by every stream load, default:None
+        """
+        assert aiohttp, 'AsyncDorisSession requires `pip install aiohttp`'
+        assert aiomysql, 'AsyncDorisSession requires `pip install aiomysql`'
+        super().__init__(fe_servers, database, user, passwd, mysql_port=mysql_port,
+                         connect_timeout=connect_timeout, read_timeout=read_timeout, redirect_ttl=redirect_ttl,
+                         fe_fail_threshold=fe_fail_threshold, fe_probe_interval=fe_probe_interval, metrics=metrics)
+        self.max_concurrency = max_concurrency
+        self.aio_pool_cfg = {'minsize': pool_minsize, 'maxsize': pool_maxsize}
+        self.http_async = None
+        self.aio_pools = []
+        self._semaphore = None
+        self._pool_lock = None
+
+    def _async_session(self):
+        if self.http_async is None or self.http_async.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=0)
+            timeout = aiohttp.ClientTimeout(total=None, connect=self.http_timeout[0], sock_read=self.http_timeout[1])
+            self.http_async = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.http_async
+
+    async def _get_be(self, table, headers, cache=True):
+        location = self.router.get(table) if cache else None
+        if location:
+            return location
+        session = self._async_session()
+        for fe_server in self.router.candidates():
+            url = f'http://{fe_server}/api/{self.database}/{table}/_stream_load'
+            try:
+                async with session.put(url, data=b'', headers=headers, allow_redirects=False,
+                                       timeout=aiohttp.ClientTimeout(total=self.http_timeout[0])) as response:
+                    status, location = response.status, response.headers.get('Location')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                DorisLogger.warning(f"fe {fe_server} is unavailable, {e!r}")
+                self.router.mark_fail(fe_server)
+                continue
+            self.router.mark_ok(fe_server)
+            if status == 307:
+                if cache:
+                    self.router.put(table, location)
+                return location
+        else:
+            raise NoAvailableBackend("No available BE nodes can be obtained. Please check configuration")
+
+    async def _streamload(self, table, dict_array, attempts=None, **kwargs):
+        start = time.perf_counter()
+        if attempts is not None:
+            attempts.append(start)
+        # encoding and compression run off the event loop, a big body does not stall the other loads
+        columns, body, headers = await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(self._prepare, dict_array, **kwargs))
+        if columns is None:
+            DorisLogger.warning(f"Nothing has been send, because dict_array was empty")
+            return LoadResult(Status='Success', NumberTotalRows=0, NumberLoadedRows=0, LoadBytes=0,
+                              Message='dict_array is empty')
+        client = {'body_bytes': len(body) if isinstance(body, (str, bytes)) else None,
+                  'serialize_ms': (time.perf_counter() - start) * 1000}
+        headers.pop('Expect')  # upload goes straight to be, no need to wait for 100-continue
+        if is_stream(body) and not isinstance(body, (str, bytes)):
+            body = _aiter(body)
+
+        session = self._async_session()
+        async with self._semaphore:
+            start = time.perf_counter()
+            url = await self._get_be(table, headers, kwargs.get('redirect_cache', True))
+            client['redirect_ms'], start = (time.perf_counter() - start) * 1000, time.perf_counter()
+            headers['label'] = kwargs.get('label') or self._label(table)
+            if columns:
+                headers['columns'] = self._columns(columns)
+            try:
+                async with session.put(url, data=body, headers=headers, allow_redirects=False) as response:
+                    status, text = response.status, await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.router.invalidate(table)
+                raise
+            client['upload_ms'] = (time.perf_counter() - start) * 1000
+        if status != 200:
+            self.router.invalidate(table)
+        return self._result(status, text, client, kwargs.get('two_phase_commit'))
+
+    @AsyncRetry(max_retry=3, retry_diff_seconds=3)
+    async def _streamload_retry(self, table, dict_array, **kwargs):
+        return await self._streamload(table, dict_array, **kwargs)
+
+    async def _measured(self, load, table, dict_array, **kwargs):
+        attempts, start = [], time.perf_counter()
+        try:
+            res = await load(table, dict_array, attempts=attempts, **kwargs)
+        except Exception as e:
+            self._record(table, error=e, client={'retries': max(len(attempts) - 1, 0),
+                                                 'elapsed_ms': round((time.perf_counter() - start) * 1000, 3)})
+            raise
+        if isinstance(res, LoadResult):
+            res.client.update(retries=max(len(attempts) - 1, 0),
+                              elapsed_ms=round((time.perf_counter() - start) * 1000, 3))
+        self._record(table, res)
+        return res
+
+    async def _streamload_chunks(self, table, dict_array, **kwargs):
+        run = _ChunkedLoad(self, table, dict_array, **kwargs)
+        max_workers, pending = kwargs.get('max_workers', 4), {}
+        async for chunk in _aiter(run.chunks):  # files and generators are read off the event loop
+            if len(pending) >= max_workers:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    run.collect(pending.pop(task), task.result)
+            sent = run.send(chunk)
+            if sent is None:
+                break
+            chunk_kwargs, pending_chunk = sent
+            task = asyncio.ensure_future(self._measured(self._streamload_retry, table, chunk, **chunk_kwargs))
+            pending[task] = pending_chunk
+        if pending:
+            await asyncio.wait(pending)
+            for task in list(pending):
+                run.collect(pending.pop(task), task.result)
+        return run.done()
+
+    @AsyncRetry(max_retry=3, retry_diff_seconds=1)
+    async def _txn_operation(self, table, operation, label, txn_id=None):
+        headers = self._txn_headers(operation, label, txn_id)
+        session = self._async_session()
+        for fe_server in self.router.candidates():
+            url = f'http://{fe_server}/api/{self.database}/{table}/_stream_load_2pc'
+            try:
+                async with session.put(url, data=b'', headers=headers) as response:
+                    status, text = response.status, await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                DorisLogger.warning(f"fe {fe_server} is unavailable, {e!r}")
+                self.router.mark_fail(fe_server)
+                continue
+            self.router.mark_ok(fe_server)
+            return self._txn_result(operation, label, txn_id, status, text)
+        return False
+
+    async def streamload_2pc(self, table, dict_array, **kwargs):
+        """
+        same as DorisSession.streamload_2pc, transactions are committed or aborted `max_workers` at a time
+        """
+        kwargs['two_phase_commit'] = True
+        max_workers = kwargs.get('max_workers', 4)
+        summary = await self._streamload_chunks(table, dict_array, **kwargs)
+        operation = 'commit' if summary else 'abort'
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def operate(txn):
+            async with semaphore:
+                return await self._txn_operation(table, operation, txn['label'], txn['txn_id'])
+
+        flags = await asyncio.gather(*[operate(txn) for txn in summary['txns']])
+        return self._txn_summary(summary, operation, list(flags))
+
+    async def streamload(self, table, dict_array, **kwargs):
+        """
+        same as DorisSession.streamload, chunks of one call are loaded `max_workers` at a time,
+        all loads of the session share `max_concurrency`
+        """
+        if kwargs.get('chunk_rows') or kwargs.get('chunk_bytes'):
+            return await self._streamload_chunks(table, dict_array, **kwargs)
+        for key in ('chunk_rows', 'chunk_bytes', 'max_workers'):
+            kwargs.pop(key, None)
+        if is_stream(dict_array):
+            return await self._measured(self._streamload, table, dict_array, **kwargs)
+        kwargs['label'] = kwargs.get('label') or self._label(table)
+        return await self._measured(self._streamload_retry, table, dict_array, **kwargs)
+
+    async def _aio_pool(self):
+        """
+        the sql pool of the fe with the fewest connections in use, pools of all fe are created on first use
+        """
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if not self.aio_pools:
+                cfg = dict(self.mysql_cfg)
+                cfg['password'], cfg['db'] = cfg.pop('passwd'), cfg.pop('database')
+                error = None
+                for host in self.pool_cfg['hosts']:
+                    try:
+                        self.aio_pools.append(await aiomysql.create_pool(**dict(cfg, host=host), **self.aio_pool_cfg))
+                    except Exception as e:
+                        DorisLogger.warning(f"connect fe {host} fail, {e!r}")
+                        error = e
+                if not self.aio_pools:
+                    raise error
+        return min(self.aio_pools, key=lambda pool: pool.size - pool.freesize)
+
+    async def execute(self, sql, args=None):
+        pool = await self._aio_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                DorisLogger.debug(f'executing ...\n\n{sql}\n')
+                await cur.execute(sql, args)
+            await conn.commit()
+        return True
+
+    async def read(self, sql, cursors=DictCursor, args=None):
+        if cursors is pymysql.cursors.DictCursor:
+            cursors = DictCursor
+        pool = await self._aio_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor(cursors) if cursors else conn.cursor() as cur:
+                DorisLogger.debug(f'executing ...\n{sql}')
+                await cur.execute(sql, args)
+                return await cur.fetchall()
+
+    async def close(self):
+        """
+        close the sql pool and all keep-alive http connections
+        """
+        if self.http_async is not None:
+            await self.http_async.close()
+            self.http_async = None
+        for pool in self.aio_pools:
+            pool.close()
+            await pool.wait_closed()
+        self.aio_pools = []
+        DorisSession.close(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __del__(self):
+        try:
+            DorisSession.close(self)
+        except:
+            ...
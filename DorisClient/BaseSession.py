@@ -18,71 +18,277 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import re
 import base64
 import json
 import time
 import uuid
+import random
+import threading
 import pymysql
 import requests
-import logging
+from functools import wraps
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ._Log import Logger
+from ._Router import FeRouter
+from ._Pool import ConnectionPool, is_connection_error
+from ._Encoder import is_stream, encode, compress, chunks
+from ._Columnar import columnar
 
 
-def Logger(name=__name__, filename=None, level='INFO', filemode='a'):
+DorisLogger = Logger(name=__name__)
+
+
+# statements changing the state of their connection, eg: use db, set enable_profile = true
+SESSION_STATEMENT = re.compile(r'^\s*(use|set)\b', re.IGNORECASE)
+
+
+class NoAvailableBackend(requests.ConnectionError):
     """
-    :param name:
-    :param filename: filename string
-    :param level:
-    :param filemode:
-    :return:
+    no fe answered a stream load with a be location, retried like any connection error
     """
-    logging.basicConfig(
-        filename=filename,
-        filemode=filemode,
-        level=level,
-        format='%(asctime)s [%(name)s] %(levelname)s: %(message)s',
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    logger = logging.getLogger(name)
-    if filename:
-        formatter = logging.Formatter('%(asctime)s [%(name)s] %(levelname)s: %(message)s', "%Y-%m-%d %H:%M:%S")
-        ch = logging.StreamHandler()
-        ch.setLevel(level)
-        ch.setFormatter(formatter)
-        logger.addHandler(ch)
-    return logger
 
 
-DorisLogger = Logger(name=__name__)
+def retry_delay(retry_times, retry_diff_seconds=3, backoff=2, max_diff_seconds=60, jitter=0.5):
+    """
+    seconds to wait before the nth retry: retry_diff_seconds * backoff ^ (n - 1),
+    capped by max_diff_seconds and randomized by +/- jitter
+    """
+    seconds = min(retry_diff_seconds * backoff ** (retry_times - 1), max_diff_seconds)
+    return max(seconds * (1 + random.uniform(-jitter, jitter)), 0)
+
+
+def retryable(flag):
+    """
+    a falsy result is retried unless it tells it is not retryable, eg: LoadResult of a data quality error
+    """
+    return getattr(flag, 'retryable', True)
 
 
 def Retry(*args, **kwargs):
+    """
+    retry when the function returns a retryable falsy result or raises one of `exceptions`, no wait before
+    the first attempt, exponential backoff with jitter between retries, stop retrying after `deadline` seconds
+
+    :param max_retry: default 3
+    :param retry_diff_seconds: wait before the first retry, default 3
+    :param backoff: wait multiplier of every next retry, default 2
+    :param max_diff_seconds: max wait between two attempts, default 60
+    :param jitter: randomize the wait by +/- jitter, default 0.5
+    :param deadline: seconds for all attempts, default None (no limit)
+    :param exceptions: exceptions to retry, default connection error (NoAvailableBackend included) and timeout of requests
+    """
     max_retry = kwargs.get('max_retry', 3)
     retry_diff_seconds = kwargs.get('retry_diff_seconds', 3)
+    backoff = kwargs.get('backoff', 2)
+    max_diff_seconds = kwargs.get('max_diff_seconds', 60)
+    jitter = kwargs.get('jitter', 0.5)
+    deadline = kwargs.get('deadline')
+    exceptions = kwargs.get('exceptions', (requests.ConnectionError, requests.Timeout))
 
     def warpp(func):
+        @wraps(func)
         def run(*args, **kwargs):
+            start = time.monotonic()
+            flag = error = None
             for i in range(max_retry + 1):
                 if i > 0:
-                    DorisLogger.warning(f"will retry after {retry_diff_seconds} seconds，retry times : {i}/{max_retry}")
-                time.sleep(retry_diff_seconds)
-                flag = func(*args, **kwargs)
-                if flag:
+                    seconds = retry_delay(i, retry_diff_seconds, backoff, max_diff_seconds, jitter)
+                    if deadline and time.monotonic() - start + seconds > deadline:
+                        DorisLogger.error(f"stop retrying, deadline {deadline} seconds exceeded")
+                        if error is not None:
+                            raise error
+                        break
+                    DorisLogger.warning(f"will retry after {seconds:.1f} seconds，retry times : {i}/{max_retry}")
+                    time.sleep(seconds)
+                try:
+                    flag, error = func(*args, **kwargs), None
+                except exceptions as e:
+                    if i == max_retry:
+                        raise
+                    error = e
+                    DorisLogger.warning(f"{func.__name__} error, {e}")
+                    continue
+                if flag or not retryable(flag):
                     return flag
+            return flag
 
         return run
 
     return warpp
 
 
+# Status of stream load response
+LOAD_SUCCESS = ('Success', 'Publish Timeout')
+# message of a failed stream load that will fail again on retry
+LOAD_FATAL_MESSAGES = (
+    'DATA_QUALITY_ERROR', 'too many filtered rows', 'ANALYSIS_ERROR', 'INVALID_ARGUMENT', 'NOT_IMPLEMENTED_ERROR',
+    'Unknown column', 'unknown table', 'does not exist', 'Access denied', 'Parse json data', 'not supported',
+)
+
+
+class LoadResult(dict):
+    """
+    be response of one stream load, truthy when the data is loaded
+
+    `Label Already Exists` of a FINISHED job (or PRECOMMITTED for a load sent with two_phase_commit) is treated
+    as success, so that a retry with the same label after the first attempt was committed does not load the data twice
+
+    `client` holds the timings measured by the client, in milliseconds:
+        serialize_ms    encoding (and compressing) the body, a streamed body is encoded while it is uploaded
+        redirect_ms     resolving the be of the table (0 when the location is reused)
+        upload_ms       http request to the be, including the load on the be side
+        elapsed_ms      all attempts of the load, including the waits between retries
+        retries         attempts after the first one
+        body_bytes      size of the body sent, None for a streamed body
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client = {}
+        self.two_phase_commit = False
+
+    def __bool__(self):
+        if self.get('Status') in LOAD_SUCCESS:
+            return True
+        done = ('FINISHED', 'PRECOMMITTED') if self.two_phase_commit else ('FINISHED',)
+        return self.get('Status') == 'Label Already Exists' and self.get('ExistingJobStatus') in done
+
+    @property
+    def retryable(self):
+        if self:
+            return False
+        if self.get('Status') == 'HttpError':
+            return self.get('HttpCode', 500) >= 500
+        message = str(self.get('Message', '')) + str(self.get('ErrorURL', ''))
+        return not any(m.lower() in message.lower() for m in LOAD_FATAL_MESSAGES)
+
+    @property
+    def loaded_rows(self):
+        return int(self.get('NumberLoadedRows') or 0)
+
+    @property
+    def load_bytes(self):
+        return int(self.get('LoadBytes') or 0)
+
+    @property
+    def timings(self):
+        """
+        timing fields of the be response in milliseconds, eg: {'LoadTimeMs': 120, 'WriteDataTimeMs': 80, ...}
+        """
+        return {k: v for k, v in self.items() if k.endswith('TimeMs')}
+
+
+class LoadSummary(dict):
+    """
+    aggregate result of a chunked streamload, truthy only when every chunk succeeded
+    (and, for streamload_2pc, every transaction is committed)
+    """
+
+    def __bool__(self):
+        return self['failed_chunks'] == 0 and self.get('committed', True)
+
+
+class _ChunkedLoad:
+    """
+    bookkeeping of a chunked streamload shared by DorisSession and AsyncDorisSession: splits the source,
+    labels the chunks and sums their results up into a LoadSummary, the sessions only schedule the loads
+
+        run = _ChunkedLoad(session, table, dict_array, **kwargs)
+        for chunk in run.chunks:
+            sent = run.send(chunk)  # None once a failed chunk aborts a 2pc load
+            kwargs, pending = sent
+            ...
+            run.collect(pending, future.result)
+        return run.done()
+    """
+
+    def __init__(self, session, table, dict_array, chunk_rows=None, chunk_bytes=None, max_workers=4, **kwargs):
+        self.session = session
+        self.table = table
+        self.summary = LoadSummary(table=table, chunks=0, success_chunks=0, failed_chunks=0, rows=0, failed_rows=0)
+        self.two_phase_commit = kwargs.get('two_phase_commit')
+        if self.two_phase_commit:
+            self.summary['txns'] = []  # label and txn id of every chunk sent, to commit or abort them
+        self.label = kwargs.pop('label', None)
+        if max_workers > 1:  # every chunk asks the fe, so that parallel chunks are spread across be
+            kwargs['redirect_cache'] = False
+        self.kwargs = kwargs
+        self.header = hasattr(dict_array, 'read') and kwargs.get('format') == 'csv_with_names'
+        self.chunks = chunks(dict_array, chunk_rows, chunk_bytes, self.header)
+        self.start = time.time()
+
+    def send(self, chunk):
+        """
+        return (streamload kwargs, pending) of the next chunk, None when the load stops sending
+        """
+        if self.two_phase_commit and self.summary['failed_chunks']:
+            return None  # the transaction will be aborted, stop sending
+        self.summary['chunks'] += 1
+        rows = len(chunk) - self.header
+        self.summary['rows'] += rows
+        # reused by every retry of the chunk
+        label = f"{self.label}-{self.summary['chunks']}" if self.label else self.session._label(self.table)
+        return dict(self.kwargs, label=label), (rows, label)
+
+    def collect(self, pending, result):
+        """
+        count the result of a chunk, `result` returns its LoadResult or raises its error
+        """
+        rows, label = pending
+        try:
+            flag = result()
+        except Exception as e:
+            DorisLogger.error(f"{self.table} chunk of {rows} rows error, {e!r}")
+            flag = False
+        if flag:
+            self.summary['success_chunks'] += 1
+        else:
+            self.summary['failed_chunks'] += 1
+            self.summary['failed_rows'] += rows
+        if self.two_phase_commit:
+            txn_id = flag.get('TxnId') if isinstance(flag, dict) else None
+            self.summary['txns'].append({'label': label, 'txn_id': txn_id})
+
+    def done(self):
+        self.summary['elapsed'] = round(time.time() - self.start, 3)
+        if self.summary:
+            DorisLogger.info(self.summary)
+        else:
+            DorisLogger.error(self.summary)
+        return self.summary
+
+
 class DorisSession:
 
-    def __init__(self, fe_servers, database, user, passwd, mysql_port=9030):
+    def __init__(self, fe_servers, database, user, passwd, mysql_port=9030,
+                 pool_connections=10, pool_maxsize=10, pool_block=False, connect_timeout=10, read_timeout=None,
+                 redirect_ttl=30, fe_fail_threshold=1, fe_probe_interval=5,
+                 mysql_pool_size=4, mysql_balance='least_busy', mysql_ping_interval=30, mysql_acquire_timeout=None,
+                 meta_cache=None, metrics=None):
         """
         :param fe_servers: fe servers list, like: ['127.0.0.1:8030', '127.0.0.2:8030', '127.0.0.3:8030']
         :param database:
         :param user:
         :param passwd:
         :param mysql_port: port for sql client, default:9030
+        :param pool_connections: number of hosts (fe/be) to keep a keep-alive pool for, default:10
+        :param pool_maxsize: max keep-alive connections kept per host, default:10
+        :param pool_block: wait for a free connection instead of opening an extra one when a host pool is full
+        :param connect_timeout: http connect timeout seconds, default:10
+        :param read_timeout: http read timeout seconds, default:None (wait until doris responds)
+        :param redirect_ttl: seconds to reuse the be location resolved for a table, 0 to resolve every load, default:30,
+                             chunks loaded in parallel always ask the fe
+        :param fe_fail_threshold: consecutive failures before a fe is marked down, default:1
+        :param fe_probe_interval: seconds between background health probes of down fe, default:5
+        :param mysql_pool_size: max sql connections per fe used by read/execute, default:4
+        :param mysql_balance: how read/execute pick a fe, least_busy or round_robin, default:least_busy
+        :param mysql_ping_interval: ping a sql connection idle for more seconds before reusing it, default:30
+        :param mysql_acquire_timeout: seconds to wait for a free sql connection, default:None (wait forever)
+        :param meta_cache: MetaCache for table metadata lookups, default:None (always ask the fe)
+        :param metrics: LoadMetrics fed by every stream load, default:None
         """
         assert fe_servers
         assert database
@@ -98,11 +304,123 @@ class DorisSession:
             'user': user,
             'passwd': passwd
         }
-        self.conn = None
+        self.pool_cfg = {
+            'hosts': [fe_server.split(':')[0] for fe_server in fe_servers],
+            'max_per_host': mysql_pool_size,
+            'balance': mysql_balance,
+            'ping_interval': mysql_ping_interval,
+            'acquire_timeout': mysql_acquire_timeout,
+        }
+        self.pool = None
+        self._local = threading.local()
+        self.meta_cache = meta_cache
+        self.metrics = metrics
+        self.http_cfg = {
+            'pool_connections': pool_connections,
+            'pool_maxsize': pool_maxsize,
+            'pool_block': pool_block,
+        }
+        self.http_timeout = (connect_timeout, read_timeout)
+        self.http = None
+        self._http_lock = threading.Lock()
+        self.router = FeRouter(fe_servers, redirect_ttl=redirect_ttl, fail_threshold=fe_fail_threshold,
+                               probe_interval=fe_probe_interval, probe=self._probe_fe)
+
+    def _pool(self):
+        if self.pool is None:
+            with self._http_lock:
+                if self.pool is None:
+                    cfg = {k: v for k, v in self.mysql_cfg.items() if k != 'host'}
+                    self.pool = ConnectionPool(**self.pool_cfg, **cfg)
+        return self.pool
+
+    @staticmethod
+    def _broken(error):
+        """
+        whether a connection left by error must be closed: connection errors, and interrupts (KeyboardInterrupt, ...)
+        that may stop a query in the middle, a generator closed between two rows leaves it usable
+        """
+        if error is None or isinstance(error, GeneratorExit):
+            return False
+        return is_connection_error(error) or not isinstance(error, Exception)
+
+    @contextmanager
+    def _conn(self, sql=None):
+        """
+        the pinned connection of the current thread, or a pooled one for the with block
 
-    def _connect(self):
-        if self.conn is None:
-            self.conn = pymysql.connect(**self.mysql_cfg)
+        a pooled connection that ran `sql` changing its state is reset when released: `use` switches it back to
+        the session database, `set` closes it, the next statement may run on any connection of the pool
+        """
+        pinned = getattr(self._local, 'conn', None)
+        if pinned is not None:
+            yield pinned
+            return
+        state = SESSION_STATEMENT.match(sql or '')
+        if state:
+            DorisLogger.warning(f"`{sql.strip()}` outside pin() only applies to this statement, "
+                                f"run it and the statements that need it inside `with doris.pin():`")
+        pool = self._pool()
+        conn = pool.acquire()
+        error = None
+        try:
+            yield conn
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            stateful = state.group(1).lower() if state else None
+            pool.release(conn, discard=self._broken(error) or stateful == 'set',
+                         database=self.database if stateful == 'use' else None)
+
+    @contextmanager
+    def pin(self, timeout=None):
+        """
+        run every read/execute of the current thread inside the with block on the same connection,
+        needed by statements that change the connection state, eg: `use db`, `set xxx`
+
+            with doris.pin():
+                doris.execute('use other_db')
+                doris.read('show data')
+
+        :param timeout: seconds to wait for a pooled connection before TimeoutError, default the pool acquire_timeout
+        """
+        if getattr(self._local, 'conn', None) is not None:
+            yield self._local.conn
+            return
+        pool = self._pool()
+        conn = self._local.conn = pool.acquire(timeout)
+        error = None
+        try:
+            yield conn
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._local.conn = None
+            pool.release(conn, discard=self._broken(error), database=self.database)
+
+    def _session(self):
+        """
+        return the keep-alive http session shared by all stream loads of this DorisSession
+        """
+        if self.http is None:
+            with self._http_lock:
+                if self.http is None:
+                    http = requests.Session()
+                    adapter = HTTPAdapter(**self.http_cfg)
+                    http.mount('http://', adapter)
+                    http.mount('https://', adapter)
+                    self.http = http
+        return self.http
+
+    def _cached(self, key, loader, database_name=None, table_name=None):
+        """
+        return loader() through meta_cache, bound to the version of database_name.table_name (all tables if None)
+        """
+        if self.meta_cache is None:
+            return loader()
+        return self.meta_cache.fetch(self, key, loader, database_name, table_name)
 
     def _label(self, table):
         return f"{table}-{uuid.uuid1()}"
@@ -110,87 +428,379 @@ class DorisSession:
     def _columns(self, keys):
         return ','.join([f'`{column}`' for column in keys])
 
-    def _get_be(self, table, headers):
-        for fe_server in self.fe_servers:
+    def _probe_fe(self, fe_server):
+        response = self._session().get(f'http://{fe_server}/api/health', timeout=self.http_timeout[0])
+        return response.status_code == 200
+
+    def _get_be(self, table, headers, cache=True):
+        """
+        be location of a stream load to table, `cache` False asks the fe even when a location is cached
+        """
+        location = self.router.get(table) if cache else None
+        if location:
+            return location
+        for fe_server in self.router.candidates():
             host, port = fe_server.split(':')
             url = f'http://{host}:{port}/api/{self.database}/{table}/_stream_load'
-            response = requests.put(url, '', headers=headers, allow_redirects=False)
+            try:
+                response = self._session().put(url, '', headers=headers, allow_redirects=False,
+                                               timeout=self.http_timeout[0])
+            except requests.RequestException as e:
+                DorisLogger.warning(f"fe {fe_server} is unavailable, {e}")
+                self.router.mark_fail(fe_server)
+                continue
+            self.router.mark_ok(fe_server)
             if response.status_code == 307:
-                return response.headers['Location']
+                location = response.headers['Location']
+                if cache:
+                    self.router.put(table, location)
+                return location
         else:
-            raise Exception("No available BE nodes can be obtained. Please check configuration")
-
-    def _streamload(self, table, dict_array, **kwargs):
-        assert isinstance(dict_array, list), 'TypeError: dict_array must be list'
-        if not dict_array:
-            DorisLogger.warning(f"Nothing has been send, because dict_array was empty")
-            return True
+            raise NoAvailableBackend("No available BE nodes can be obtained. Please check configuration")
 
+    def _prepare(self, dict_array, **kwargs):
+        """
+        return (columns, body, headers) of a stream load request, columns is None when dict_array is empty
+        """
+        columns, body, format_headers = encode(
+            dict_array,
+            format=kwargs.get('format', 'json'),
+            columns=kwargs.get('columns'),
+            column_separator=kwargs.get('column_separator', '\t'),
+            line_delimiter=kwargs.get('line_delimiter', '\n'),
+            enclose=kwargs.get('enclose', '"'),
+            escape=kwargs.get('escape', '\\'),
+        )
         headers = {
             'Expect': '100-continue',
             'Authorization': 'Basic ' + self.Authorization,
-            'format': 'json',
-            'strip_outer_array': 'true',
-            'fuzzy_parse': 'true',
         }
+        headers.update(format_headers)
         if kwargs.get('sequence_col'):
             headers['function_column.sequence_col'] = kwargs.get('sequence_col')
         if kwargs.get('merge_type'):
             headers['merge_type'] = kwargs.get('merge_type')
         if kwargs.get('delete'):
             headers['delete'] = kwargs.get('delete')
+        if kwargs.get('two_phase_commit'):
+            headers['two_phase_commit'] = 'true'
+        if kwargs.get('compress_type') and columns is not None:
+            body = compress(body, kwargs.get('compress_type'), kwargs.get('compress_level'))
+            headers['compress_type'] = kwargs.get('compress_type')
+        return columns, body, headers
 
-        url = self._get_be(table, headers)
-        headers['label'] = self._label(table)
-        headers['columns'] = self._columns(dict_array[0].keys())
-        response = requests.put(url, json.dumps(dict_array), headers=headers, allow_redirects=False)
-        if response.status_code == 200:
-            res = response.json()
+    def _result(self, status_code, text, client=None, two_phase_commit=False):
+        """
+        return LoadResult of the be response, truthy when the data is loaded
+        """
+        if status_code == 200:
+            res = LoadResult(json.loads(text))
+            res.two_phase_commit = bool(two_phase_commit)
             if res.get('Status') == 'Success':
-                DorisLogger.info(res)
-                return True
-            elif res.get('Status') == 'Publish Timeout':
+                DorisLogger.info(f"{res.get('Label')} loaded {res.loaded_rows} rows, {res.load_bytes} bytes "
+                                 f"in {res.get('LoadTimeMs')} ms")
+                DorisLogger.debug(res)
+            elif res:
                 DorisLogger.warning(res)
-                return True
             else:
                 DorisLogger.error(res)
-                return False
         else:
-            DorisLogger.error(response.text)
-            return False
+            res = LoadResult(Status='HttpError', HttpCode=status_code, Message=text)
+            DorisLogger.error(text)
+        res.client.update({k: round(v, 3) if isinstance(v, float) else v for k, v in (client or {}).items()})
+        return res
+
+    def _record(self, table, res=None, error=None, client=None):
+        """
+        feed metrics with the final result of a stream load, or the error it raised
+        """
+        if self.metrics is not None and (error is not None or isinstance(res, LoadResult)):
+            self.metrics.record(table, res if error is None else None, error, client)
+
+    def _streamload(self, table, dict_array, attempts=None, **kwargs):
+        start = time.perf_counter()
+        if attempts is not None:
+            attempts.append(start)
+        columns, body, headers = self._prepare(dict_array, **kwargs)
+        if columns is None:
+            DorisLogger.warning(f"Nothing has been send, because dict_array was empty")
+            return LoadResult(Status='Success', NumberTotalRows=0, NumberLoadedRows=0, LoadBytes=0,
+                              Message='dict_array is empty')
+        client = {'body_bytes': len(body) if isinstance(body, (str, bytes)) else None}
+        client['serialize_ms'], start = (time.perf_counter() - start) * 1000, time.perf_counter()
+
+        url = self._get_be(table, headers, kwargs.get('redirect_cache', True))
+        client['redirect_ms'], start = (time.perf_counter() - start) * 1000, time.perf_counter()
+        headers['label'] = kwargs.get('label') or self._label(table)
+        if columns:
+            headers['columns'] = self._columns(columns)
+        try:
+            response = self._session().put(url, body, headers=headers, allow_redirects=False,
+                                           timeout=self.http_timeout)
+        except requests.RequestException:
+            self.router.invalidate(table)
+            raise
+        client['upload_ms'] = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            self.router.invalidate(table)
+        return self._result(response.status_code, response.text, client, kwargs.get('two_phase_commit'))
 
     @Retry(max_retry=3, retry_diff_seconds=3)
+    def _streamload_retry(self, table, dict_array, **kwargs):
+        return self._streamload(table, dict_array, **kwargs)
+
+    def _measured(self, load, table, dict_array, **kwargs):
+        """
+        run load (_streamload or _streamload_retry), add the retries and the elapsed time of all attempts
+        to the result and feed metrics with it
+        """
+        attempts, start = [], time.perf_counter()
+        try:
+            res = load(table, dict_array, attempts=attempts, **kwargs)
+        except Exception as e:
+            self._record(table, error=e, client={'retries': max(len(attempts) - 1, 0),
+                                                 'elapsed_ms': round((time.perf_counter() - start) * 1000, 3)})
+            raise
+        if isinstance(res, LoadResult):
+            res.client.update(retries=max(len(attempts) - 1, 0),
+                              elapsed_ms=round((time.perf_counter() - start) * 1000, 3))
+        self._record(table, res)
+        return res
+
+    def _streamload_chunks(self, table, dict_array, **kwargs):
+        run = _ChunkedLoad(self, table, dict_array, **kwargs)
+        max_workers, pending = kwargs.get('max_workers', 4), {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='DorisStreamLoad') as executor:
+            for chunk in run.chunks:
+                if len(pending) >= max_workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        run.collect(pending.pop(future), future.result)
+                sent = run.send(chunk)
+                if sent is None:
+                    break
+                chunk_kwargs, pending_chunk = sent
+                future = executor.submit(self._measured, self._streamload_retry, table, chunk, **chunk_kwargs)
+                pending[future] = pending_chunk
+            for future in list(pending):
+                run.collect(pending.pop(future), future.result)
+        return run.done()
+
+    def _txn_headers(self, operation, label, txn_id=None):
+        headers = {
+            'Authorization': 'Basic ' + self.Authorization,
+            'txn_operation': operation,
+        }
+        if txn_id:
+            headers['txn_id'] = str(txn_id)
+        else:
+            headers['label'] = label
+        return headers
+
+    def _txn_result(self, operation, label, txn_id, status_code, text):
+        """
+        whether the fe response tells the transaction is committed / aborted
+        """
+        res = json.loads(text) if status_code == 200 else {'status': 'HttpError', 'msg': text}
+        done = 'already visible' if operation == 'commit' else 'already aborted'
+        if res.get('status') == 'Success' or done in str(res.get('msg')):
+            DorisLogger.info(f"{operation} {label} txn {txn_id} : {res}")
+            return True
+        DorisLogger.error(f"{operation} {label} txn {txn_id} : {res}")
+        return False
+
+    def _txn_summary(self, summary, operation, flags):
+        summary['committed'] = operation == 'commit' and all(flags)
+        if operation == 'commit' and not summary['committed']:
+            DorisLogger.error(f"{summary['table']} {flags.count(False)}/{len(flags)} transactions are not committed !!!")
+        elif operation == 'abort':
+            DorisLogger.error(f"{summary['table']} load failed, {flags.count(True)}/{len(flags)} transactions are aborted")
+        return summary
+
+    @Retry(max_retry=3, retry_diff_seconds=1)
+    def _txn_operation(self, table, operation, label, txn_id=None):
+        """
+        commit or abort a pre-committed stream load by txn id, or by label when txn id is unknown
+        """
+        headers = self._txn_headers(operation, label, txn_id)
+        for fe_server in self.router.candidates():
+            url = f'http://{fe_server}/api/{self.database}/{table}/_stream_load_2pc'
+            try:
+                response = self._session().put(url, '', headers=headers, timeout=self.http_timeout)
+            except requests.RequestException as e:
+                DorisLogger.warning(f"fe {fe_server} is unavailable, {e}")
+                self.router.mark_fail(fe_server)
+                continue
+            self.router.mark_ok(fe_server)
+            return self._txn_result(operation, label, txn_id, response.status_code, response.text)
+        return False
+
+    def streamload_2pc(self, table, dict_array, **kwargs):
+        """
+        all-or-nothing load: every chunk is pre-committed in parallel with `two_phase_commit`,
+        then all transactions are committed when every chunk succeeded, or all are aborted.
+        be must enable stream load 2pc (disable_stream_load_2pc=false on old versions)
+
+        :param table: target table
+        :param dict_array: same as streamload
+        :param kwargs: same as streamload, chunk_rows/chunk_bytes/max_workers split the load into transactions
+        :return: LoadSummary, truthy only when every transaction is committed
+        """
+        kwargs['two_phase_commit'] = True
+        max_workers = kwargs.get('max_workers', 4)
+        summary = self._streamload_chunks(table, dict_array, **kwargs)
+        operation = 'commit' if summary else 'abort'
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='DorisStreamLoad2pc') as executor:
+            flags = list(executor.map(lambda txn: self._txn_operation(table, operation, txn['label'], txn['txn_id']),
+                                      summary['txns']))
+        return self._txn_summary(summary, operation, flags)
+
     def streamload(self, table, dict_array, **kwargs):
         # document >> https://github.com/TurboWay/DorisClient
         """
         :param table: target table
         :param dict_array: dict list ,eg: [{col1:val1}, {col2:val2}]
+                           or any iterable/generator of dict, or a file-like object with one json per line,
+                           which is encoded incrementally and streamed, such a source is read once and not retried
+                           unless it is split by chunk_rows/chunk_bytes
         :param kwargs:
              merge_type：APPEND，DELETE，MERGE
              delete：Only meaningful under MERGE, indicating the deletion condition of the data function_column.
              sequence_col: Only applicable to UNIQUE_KEYS. Under the same key column,
                            ensure that the value column is REPLACEed according to the source_sequence column.
-        :return:
+             format: json (default), csv, csv_with_names. csv is encoded in the order of `columns`
+                     (default: keys of the first row) and is much cheaper to build and parse than json
+             columns: column order for csv, also sent as the `columns` header
+             column_separator: csv column separator, default \\t
+             line_delimiter: csv line delimiter, default \\n
+             enclose: csv enclose char for values containing a separator, default ", None to disable
+             escape: csv escape char for the enclose char inside an enclosed value, default \\
+             label: stream load label, default: table-uuid, the same label is used by every retry,
+                    chunks are labeled `label-n` so that rerunning the same load with the same label is idempotent
+             compress_type: gz, deflate, bz2, lz4 (pip install lz4), zstd (pip install zstandard),
+                            the body is compressed while it is streamed, check that your doris version
+                            supports the codec for the format
+             compress_level: codec compression level, default: codec default
+             chunk_rows: split dict_array into chunks of at most chunk_rows rows
+             chunk_bytes: split dict_array into chunks of about chunk_bytes bytes
+             max_workers: chunks loaded at the same time, default 4. each chunk has its own label and retry
+        :return: LoadResult (truthy when loaded), or a LoadSummary when dict_array is split by chunk_rows/chunk_bytes,
+                 an empty dict_array returns a successful LoadResult of 0 rows
         """
-        return self._streamload(table, dict_array, **kwargs)
+        if kwargs.get('chunk_rows') or kwargs.get('chunk_bytes'):
+            return self._streamload_chunks(table, dict_array, **kwargs)
+        for key in ('chunk_rows', 'chunk_bytes', 'max_workers'):
+            kwargs.pop(key, None)
+        if is_stream(dict_array):
+            return self._measured(self._streamload, table, dict_array, **kwargs)
+        kwargs['label'] = kwargs.get('label') or self._label(table)  # reused by every retry
+        return self._measured(self._streamload_retry, table, dict_array, **kwargs)
 
     def execute(self, sql, args=None):
-        self._connect()
-        with self.conn.cursor() as cur:
-            DorisLogger.debug(f'executing ...\n\n{sql}\n')
-            cur.execute(sql, args)
-            self.conn.commit()
+        with self._conn(sql) as conn:
+            with conn.cursor() as cur:
+                DorisLogger.debug(f'executing ...\n\n{sql}\n')
+                cur.execute(sql, args)
+                conn.commit()
         return True
 
     def read(self, sql, cursors=pymysql.cursors.DictCursor, args=None):
-        self._connect()
-        with self.conn.cursor(cursors) as cur:
+        for i in range(2):
+            try:
+                with self._conn(sql) as conn:
+                    with conn.cursor(cursors) as cur:
+                        DorisLogger.debug(f'executing ...\n{sql}')
+                        cur.execute(sql, args)
+                        return cur.fetchall()
+            except Exception as e:
+                # a broken pooled connection is dropped and the query is sent once more on a new one
+                if i or not is_connection_error(e) or getattr(self._local, 'conn', None) is not None:
+                    raise
+                DorisLogger.warning(f'connection lost, read again on a new connection, {e}')
+
+    def iter_read(self, sql, batch_size=None, cursors=pymysql.cursors.SSDictCursor, args=None):
+        """
+        yield rows as they arrive with an unbuffered server-side cursor, memory stays constant whatever the result size
+
+        :param sql:
+        :param batch_size: yield lists of batch_size rows instead of single rows
+        :param cursors: SSDictCursor (default) for dict rows, SSCursor for tuple rows
+        :param args:
+
+            for rows in doris.iter_read('select * from meta_tablet', batch_size=10000):
+                ...
+
+        stopping early (break / close the generator) drops the connection, so the fe cancels the query
+        instead of sending the rest of the result
+        """
+        with self._ss_cursor(sql, args, cursors or pymysql.cursors.SSCursor) as cur:
+            if batch_size:
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            else:
+                for row in cur:
+                    yield row
+
+    def read_columns(self, sql, args=None, batch_size=10000, numpy=False):
+        """
+        read a result column by column, values of a column are kept in one array instead of one dict per row,
+        int and float columns without NULL are packed as array('q') / array('d')
+
+        :param sql:
+        :param args:
+        :param batch_size: rows fetched from the unbuffered cursor at a time
+        :param numpy: return numpy arrays, requires `pip install numpy`
+
+            result = doris.read_columns('select * from meta_tablet')
+            result.names, result['TabletId'], len(result)
+            df = result.to_pandas()
+        """
+        with self._ss_cursor(sql, args, pymysql.cursors.SSCursor) as cur:
+            return columnar(cur, batch_size, numpy)
+
+    @contextmanager
+    def _ss_cursor(self, sql, args, cursors):
+        pinned = getattr(self._local, 'conn', None)
+        pool = self._pool()
+        conn = pinned if pinned is not None else pool.acquire()
+        cur = conn.cursor(cursors)
+        finished = False
+        try:
             DorisLogger.debug(f'executing ...\n{sql}')
             cur.execute(sql, args)
-            return cur.fetchall()
+            yield cur
+            finished = True
+        finally:
+            if pinned is not None:
+                cur.close()  # a pinned connection is kept, the rest of the result is drained
+            elif finished:
+                cur.close()
+                pool.release(conn)
+            else:
+                pool.release(conn, discard=True)
+
+    def close(self):
+        """
+        close the sql connections and all keep-alive http connections
+        """
+        if self.http is not None:
+            self.http.close()
+            self.http = None
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def __del__(self):
         try:
-            self.conn.close()
+            self.close()
         except:
             ...
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import os
+import json
+import time
+import base64
+import decimal
+import hashlib
+import datetime
+import sqlite3
+import threading
+from .BaseSession import Logger
+
+log = Logger(name=__name__)
+
+VERSION_SQL = """
+select table_schema, table_name, update_time
+from information_schema.tables
+where table_type = 'BASE TABLE'
+limit 100000000
+"""
+
+
+# json cannot tell these types apart from str / list, they are stored tagged so that a hit returns what a miss does
+_TAGS = {
+    '__datetime__': datetime.datetime.fromisoformat,
+    '__date__': datetime.date.fromisoformat,
+    '__time__': datetime.time.fromisoformat,
+    '__timedelta__': lambda seconds: datetime.timedelta(seconds=seconds),
+    '__decimal__': decimal.Decimal,
+    '__bytes__': base64.b64decode,
+    '__tuple__': tuple,
+}
+
+
+def _tagged(value):
+    if isinstance(value, dict):
+        return {k: _tagged(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_tagged(v) for v in value]
+    if isinstance(value, tuple):
+        return {'__tuple__': [_tagged(v) for v in value]}
+    if isinstance(value, datetime.datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'__date__': value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {'__time__': value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {'__timedelta__': value.total_seconds()}
+    if isinstance(value, decimal.Decimal):
+        return {'__decimal__': str(value)}
+    if isinstance(value, bytes):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    return value
+
+
+def _untagged(obj):
+    if len(obj) == 1:
+        tag, value = next(iter(obj.items()))
+        if tag in _TAGS:
+            return _TAGS[tag](value)
+    return obj
+
+
+def _dumps(value):
+    return json.dumps(_tagged(value), default=str)
+
+
+def _loads(text):
+    return json.loads(text, object_hook=_untagged)
+
+
+class MetaCache:
+    """
+    Local SQLite cache of advisory table metadata (tablet sizes, collect base) shared by sessions
+
+    an entry is used while it is younger than `ttl` seconds and the table version it was stored with
+    (update_time in information_schema.tables) is unchanged, the versions of all tables are read
+    in one query at most every `version_interval` seconds
+
+        cache = MetaCache('/tmp/doris_meta.sqlite', ttl=600)
+        da = DorisAdmin(**doris_cfg, meta_cache=cache)
+    """
+
+    def __init__(self, path=None, ttl=300, version_interval=10):
+        """
+        :param path: sqlite file, shared by processes using the same path, default None (in memory)
+        :param ttl: seconds an entry is used at most, default 300
+        :param version_interval: seconds to reuse the table versions read from the fe, 0 to read them every lookup
+        """
+        self.path = os.path.expanduser(path) if path else ':memory:'
+        self.ttl = ttl
+        self.version_interval = version_interval
+        self.stats = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+        self._versions = {}  # (database_name, table_name) -> update_time
+        self._versions_at = 0
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock, self._db:
+            self._db.execute("""
+            create table if not exists meta_cache (
+                key text primary key,
+                database_name text,
+                table_name text,
+                version text,
+                value text,
+                created real
+            )""")
+            self._db.execute("create index if not exists meta_cache_table on meta_cache (database_name, table_name)")
+
+    def versions(self, session):
+        """
+        return {(database_name, table_name): update_time}, refreshed every `version_interval` seconds
+        """
+        with self._lock:
+            fresh = time.monotonic() - self._versions_at < self.version_interval
+        if not fresh:
+            versions = {(r['table_schema'], r['table_name']): str(r['update_time']) for r in session.read(VERSION_SQL)}
+            with self._lock:
+                self._versions, self._versions_at = versions, time.monotonic()
+        return self._versions
+
+    def version(self, session, database_name=None, table_name=None):
+        """
+        version of a table, or of all tables when table_name is None
+        """
+        versions = self.versions(session)
+        if table_name:
+            return versions.get((database_name, table_name), '')
+        return hashlib.md5(json.dumps(sorted(versions.items())).encode('utf-8')).hexdigest()
+
+    def get(self, key, version=None):
+        """
+        return the value stored for key, None when missing, expired or stored with another version
+        """
+        with self._lock:
+            row = self._db.execute("select version, value, created from meta_cache where key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[2] > self.ttl or (version is not None and row[0] != version):
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return _loads(row[1])
+
+    def put(self, key, value, version=None, database_name=None, table_name=None):
+        with self._lock, self._db:
+            self._db.execute("insert or replace into meta_cache values (?, ?, ?, ?, ?, ?)",
+                             (key, database_name, table_name, version, _dumps(value), time.time()))
+
+    def fetch(self, session, key, loader, database_name=None, table_name=None):
+        """
+        return the cached value of key, call loader() and store its result on a miss
+
+        the entry is bound to the version of database_name.table_name, or of all tables when table_name is None
+        """
+        version = self.version(session, database_name, table_name)
+        value = self.get(key, version)
+        if value is None:
+            value = loader()
+            self.put(key, value, version, database_name, table_name)
+        return value
+
+    def invalidate(self, database_name=None, table_name=None):
+        """
+        drop the entries of a table, of a database, or everything
+        """
+        with self._lock, self._db:
+            if table_name:
+                self._db.execute("delete from meta_cache where database_name = ? and table_name = ?",
+                                 (database_name, table_name))
+            elif database_name:
+                self._db.execute("delete from meta_cache where database_name = ?", (database_name,))
+            else:
+                self._db.execute("delete from meta_cache")
+            self._versions_at = 0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -18,20 +18,94 @@
 # specific language governing permissions and limitations
 # under the License.
 
-import re
+import json
 import time
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from .BaseSession import DorisSession, Logger
-from ._BaseSql import MetaSql, MetaSql_tablets, MetaDDL_Table, MetaDDL_Tablet, MetaDDL_Partition, MetaDDL_Size, \
-    MetaDDL_Table_Count, MetaDDL_Materialized_View, MetaDDL_Backup
+from ._Ddl import parse_ddl, REPLICATION
+from ._Pipeline import Pipeline
+from ._BaseSql import MetaSql, MetaSql_tablets, MetaSql_tablets_delta, MetaSql_size_delta, MetaDDL_Table, \
+    MetaDDL_Tablet, MetaDDL_Partition, MetaDDL_Size, MetaDDL_Table_Count, MetaDDL_Materialized_View, MetaDDL_Backup
 
 log = Logger(name=__name__)
 
 
+def ordered_map(func, items, workers=8):
+    """
+    run func over items on `workers` threads, yield the results in the order of items,
+    at most workers * 2 items are submitted ahead of the result being yielded
+    """
+    if workers <= 1:
+        yield from map(func, items)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='DorisMeta') as executor:
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def unordered_map(func, items, workers=8):
+    """
+    run func over items on `workers` threads, yield (item, result) as soon as each result is ready,
+    at most workers * 2 items are submitted ahead
+    """
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='DorisMeta') as executor:
+        pending = {}
+        try:
+            for item in items:
+                if len(pending) >= workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield pending.pop(future), future.result()
+                pending[executor.submit(func, item)] = item
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
 class DorisMeta(DorisSession):
     """
     Recycle `show xxx from table` for each table to collect metadata
     """
 
+    def __init__(self, *args, flush_bytes=16 * 1024 * 1024, queue_size=8, **kwargs):
+        """
+        DorisSession arguments, and:
+        :param flush_bytes: collectors load about flush_bytes json bytes at a time, default 16MB
+        :param queue_size: lists of rows fetched ahead of the load, default 8
+        """
+        super().__init__(*args, **kwargs)
+        self.flush_bytes = flush_bytes
+        self.queue_size = queue_size
+        self.capabilities = {}  # bulk source -> supported by the cluster
+
+    def _supports(self, name, sql):
+        """
+        whether the sql of a bulk source runs on this cluster, checked once per session
+        """
+        if name not in self.capabilities:
+            try:
+                self.read(sql)
+                self.capabilities[name] = True
+            except Exception as e:
+                log.warning(f"{name} is not available, fall back to per table statements, {e}")
+                self.capabilities[name] = False
+        return self.capabilities[name]
+
     def _delete_sql(self, meta_table, **kwargs):
         """
         return (delete_sql, filter)
@@ -49,9 +123,13 @@ class DorisMeta(DorisSession):
         collect_type = kwargs.get('collect_type')
         filter = kwargs.get('filter')
         sql = MetaSql_tablets if collect_type == 'tablets_sql' else MetaSql
+        if collect_type == 'tablets_delta':
+            sql = MetaSql_tablets_delta.format(meta_table=kwargs.get('meta_table', 'meta_tablet'))
         if filter:
             sql = sql.replace('1=1', filter)
-        return self.read(sql)
+        if collect_type == 'tablets_delta':
+            return self.read(sql)
+        return self._cached(f"base:{hashlib.md5(sql.encode('utf-8')).hexdigest()}", lambda: self.read(sql))
 
     def create_tables(self):
         self.execute(MetaDDL_Table)
@@ -62,98 +140,224 @@ class DorisMeta(DorisSession):
         self.execute(MetaDDL_Materialized_View)
         self.execute(MetaDDL_Backup)
 
-    def collect_table(self, meta_table='meta_table', ignore_view=True, **kwargs):
+    def collect_table(self, meta_table='meta_table', ignore_view=True, bulk=False, with_ddl=None, workers=None,
+                      **kwargs):
         """
         use `show create table xxx` collect meta  ==> meta_table
+        param bulk: take model, buckets and properties of all tables from information_schema.table_options and
+            information_schema.table_properties (doris 2.1+) in two queries, fall back to `show create table`
+        param with_ddl: with bulk, still read the ddl of each table with one `show create table` per table
+            (`workers` at a time), default False with bulk: the bulk path stays two queries whatever the number of
+            tables and leaves ddl empty, True fills ddl at the cost of one round trip per table
+        param workers: show statements running at the same time, default and at most one per pooled connection
         param **kwargs:
             database_name    filter condition, default None
             table_name       filter condition, default None
         """
         delete_sql, filter = self._delete_sql(meta_table, **kwargs)
-        data = []
-        for row in self._base(filter=filter):
-            if ignore_view and row['table_type'] == 'VIEW':
-                continue
-            del row['partitions_sql'], row['tablets_sql']
+        workers = self._workers(workers)
+        with_ddl = not bulk if with_ddl is None else with_ddl
+        if bulk and self._supports('table_options', self._TABLE_OPTIONS_SQL + ' limit 1') \
+                and self._supports('table_properties', self._TABLE_PROPERTIES_SQL + ' limit 1'):
+            rows = self._collect_table_bulk(ignore_view, with_ddl, workers, filter)
+        else:
+            rows = (row for row in self._base(filter=filter) if not (ignore_view and row['table_type'] == 'VIEW'))
+            rows = ordered_map(self._table_meta, rows, workers)
+        self._flush(meta_table, ([row] for row in rows), before=delete_sql)
+
+    def _table_meta(self, row):
+        del row['partitions_sql'], row['tablets_sql']
+        try:
+            sql = row.pop('ddl_sql')
+            ddl = self.read(sql, cursors=None)[0][1]
+            row['ddl'] = ddl
+            row['update_time'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+            if sql.startswith('show create table'):
+                row.update(parse_ddl(ddl).meta())
+        except Exception as e:
+            log.warning(f"{row['database_name']}.{row['table_name']} meta error, {e}")
+        return row
+
+    _TABLE_OPTIONS_SQL = "select TABLE_SCHEMA, TABLE_NAME, TABLE_MODEL, BUCKETS_NUM from information_schema.table_options"
+    _TABLE_PROPERTIES_SQL = "select TABLE_SCHEMA, TABLE_NAME, PROPERTY_NAME, PROPERTY_VALUE " \
+                            "from information_schema.table_properties"
+    _MODELS = {'DUP': 'DUPLICATE', 'UNI': 'UNIQUE', 'AGG': 'AGGREGATE'}
+
+    def _collect_table_bulk(self, ignore_view, with_ddl, workers, filter):
+        options = {(r['TABLE_SCHEMA'], r['TABLE_NAME']): r for r in self.read(self._TABLE_OPTIONS_SQL)}
+        properties = {}
+        for r in self.read(self._TABLE_PROPERTIES_SQL):
+            properties.setdefault((r['TABLE_SCHEMA'], r['TABLE_NAME']), {})[r['PROPERTY_NAME']] = r['PROPERTY_VALUE']
+        rows = [row for row in self._base(filter=filter) if not (ignore_view and row['table_type'] == 'VIEW')]
+
+        def ddl(row):
             try:
-                sql = row.pop('ddl_sql')
-                ddl = self.read(sql, cursors=None)[0][1]
-                row['ddl'] = ddl
-                row['update_time'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
-                if sql.startswith('show create table'):
-                    engine = re.findall('ENGINE=(.*)', ddl)
-                    model = re.findall('(.*) KEY\(', ddl)
-                    bucket_num = re.findall('BUCKETS (\d+)', ddl)
-                    properties = re.findall('PROPERTIES \((.*)\)', ddl, re.S)
-                    properties = '{' + properties[0].replace(' = ', ':').replace('\n', '') + '}' if properties else '{}'
-                    replication_num = re.findall('tag\.location\.[^,]+: (\d+)',
-                                                 eval(properties).get('replication_allocation'))
-                    row.update({
-                        'engine': engine[0] if engine else '',
-                        'model': model[0] if model else '',
-                        'replication_num': sum([int(i) for i in replication_num]),
-                        'bucket_num': bucket_num[0] if bucket_num else 0,
-                        'properties': properties
-                    })
+                return self.read(row['ddl_sql'], cursors=None)[0][1]
             except Exception as e:
                 log.warning(f"{row['database_name']}.{row['table_name']} meta error, {e}")
-            finally:
-                data.append(row)
-        if data:
-            self.execute(delete_sql)
-            self.streamload(meta_table, data)
 
-    def _collect(self, meta_table, collect_type, **kwargs):
+        ddls = ordered_map(ddl, rows, workers) if with_ddl else (None for _ in rows)
+        update_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+        for row, table_ddl in zip(rows, ddls):
+            key = (row['database_name'], row['table_name'])
+            for k in ('ddl_sql', 'partitions_sql', 'tablets_sql'):
+                del row[k]
+            row['ddl'] = table_ddl
+            row['update_time'] = update_time
+            if key in options:
+                props = properties.get(key, {})
+                replication_num = REPLICATION.findall(props.get('replication_allocation', ''))
+                row.update({
+                    'engine': 'OLAP',
+                    'model': self._MODELS.get(str(options[key]['TABLE_MODEL'])[:3].upper(), options[key]['TABLE_MODEL']),
+                    'replication_num': sum(int(i) for i in replication_num) or props.get('replication_num'),
+                    'bucket_num': options[key]['BUCKETS_NUM'] or 0,
+                    'properties': json.dumps(props),
+                })
+            yield row
+
+    def _show(self, row, collect_type):
+        """
+        return the items of a show statement, None when it fails
+        """
+        database_name, table_name, sql = row['database_name'], row['table_name'], row[collect_type]
+        try:
+            items = self.read(sql)
+        except Exception as e:
+            log.warning(f"{database_name}.{table_name} meta error, {e}")
+            return None
+        update_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+        for item in items:
+            item['database_name'] = database_name
+            item['table_name'] = table_name
+            if item.get('LocalDataSize'):
+                item['DataSize'] = item.get('LocalDataSize')  # meta key rename since 1.2
+            if collect_type == 'tablets_sql':
+                item['PartitionId'] = row.get('PartitionId')
+                item['PartitionName'] = row.get('PartitionName')
+            item['update_time'] = update_time
+        return items
+
+    def _flush(self, meta_table, batches, **kwargs):
+        """
+        streamload lists of items while the next ones are fetched, about `flush_bytes` at a time
+
+        param kwargs: Pipeline kwargs, eg: before, prepare, flush_interval
+        """
+        with Pipeline(self, meta_table, flush_bytes=self.flush_bytes, queue_size=self.queue_size,
+                      **kwargs) as pipeline:
+            for items in batches:
+                pipeline.put(items)
+        return pipeline.stats
+
+    def _delete_partitions(self, meta_table, database_name, table_name, partition_ids=None):
+        sql = f"delete from {meta_table} where database_name='{database_name}' and table_name='{table_name}'"
+        if partition_ids:
+            sql += f" and PartitionId in ({','.join(sorted(partition_ids))})"
+        self.execute(sql)
+
+    def _workers(self, workers=None):
+        """
+        threads of a collector, each holds a pooled connection: at most the pool capacity
+        (mysql_pool_size * fe), default the whole pool
+        """
+        capacity = self._pool().capacity
+        if workers and workers > capacity:
+            log.warning(f"workers {workers} > {capacity} connections of the pool (mysql_pool_size * fe), "
+                        f"use {capacity} workers")
+        return min(workers or capacity, capacity)
+
+    def _collect(self, meta_table, collect_type, workers=None, incremental=False, **kwargs):
         delete_sql, filter = self._delete_sql(meta_table, **kwargs)
+        workers = self._workers(workers)
+        if incremental and collect_type == 'partitions_sql':
+            return self._collect_partition_delta(meta_table, workers, filter)
+        if incremental:
+            return self._collect_tablet_delta(meta_table, workers, filter)
         self.execute(delete_sql)
-        data = []
-        for row in self._base(collect_type=collect_type, filter=filter):
-            database_name, table_name, sql = row['database_name'], row['table_name'], row[collect_type]
-            if not sql:
-                continue
-            try:
-                items = self.read(sql)
-                for item in items:
-                    item['database_name'] = database_name
-                    item['table_name'] = table_name
-                    if item.get('LocalDataSize'):
-                        item['DataSize'] = item.get('LocalDataSize')  # meta key rename since 1.2
-                    if collect_type == 'tablets_sql':
-                        item['PartitionId'] = row.get('PartitionId')
-                        item['PartitionName'] = row.get('PartitionName')
-                    item['update_time'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
-                    data.append(item)
-            except Exception as e:
-                log.warning(f"{database_name}.{table_name} meta error, {e}")
-            finally:
-                if len(data) >= 30000:
-                    if self.streamload(meta_table, data):
-                        data.clear()
-                    else:
-                        raise Exception("streamload error !!!")
-        if data:
-            if self.streamload(meta_table, data):
-                ...
-            else:
-                raise Exception("streamload error !!!")
-
-    def collect_tablet(self, meta_table='meta_tablet', **kwargs):
+        rows = (row for row in self._base(collect_type=collect_type, filter=filter) if row[collect_type])
+        self._flush(meta_table, ordered_map(lambda row: self._show(row, collect_type), rows, workers))
+
+    def _collect_partition_delta(self, meta_table, workers, filter):
+        """
+        keep partitions whose VisibleVersion and VisibleVersionTime are unchanged,
+        replace changed ones, add new ones and delete dropped ones
+        """
+        stored = {}  # (database_name, table_name) -> {PartitionId: (VisibleVersion, VisibleVersionTime)}
+        sql = f"select database_name, table_name, PartitionId, VisibleVersion, VisibleVersionTime " \
+              f"from {meta_table} where {filter or '1=1'}"
+        for row in self.read(sql):
+            stored.setdefault((row['database_name'], row['table_name']), {})[str(row['PartitionId'])] = \
+                (str(row['VisibleVersion']), str(row['VisibleVersionTime']))
+        rows = [row for row in self._base(collect_type='partitions_sql', filter=filter) if row['partitions_sql']]
+        counts = {'changed': 0, 'dropped': 0}
+
+        def changes():
+            results = ordered_map(lambda row: self._show(row, 'partitions_sql'), rows, workers)
+            for row, items in zip(rows, results):
+                if items is None:
+                    continue  # keep what is stored when show fails
+                old = stored.get((row['database_name'], row['table_name']), {})
+                changed = [item for item in items if old.get(str(item['PartitionId'])) !=
+                           (str(item['VisibleVersion']), str(item['VisibleVersionTime']))]
+                seen = {str(item['PartitionId']) for item in items}
+                dropped = [pid for pid in old if pid not in seen]
+                replaced = [str(item['PartitionId']) for item in changed if str(item['PartitionId']) in old]
+                if dropped or replaced:
+                    self._delete_partitions(meta_table, row['database_name'], row['table_name'], dropped + replaced)
+                counts['changed'] += len(changed)
+                counts['dropped'] += len(dropped)
+                yield changed
+
+        self._flush(meta_table, changes())
+        for database_name, table_name in stored.keys() - {(r['database_name'], r['table_name']) for r in rows}:
+            self._delete_partitions(meta_table, database_name, table_name)
+            counts['dropped'] += len(stored[(database_name, table_name)])
+        log.info(f"{meta_table} {counts['changed']} partitions changed, {counts['dropped']} dropped")
+
+    def _collect_tablet_delta(self, meta_table, workers, filter):
+        """
+        collect tablets of partitions whose tablet version differs from the VisibleVersion in meta_partition,
+        delete tablets of partitions no longer in meta_partition
+        """
+        where = filter or '1=1'
+        rows = self._base(collect_type='tablets_delta', filter=filter, meta_table=meta_table)
+        stored = {(r['database_name'], r['table_name'], str(r['PartitionId'])) for r in
+                  self.read(f"select distinct database_name, table_name, PartitionId from {meta_table} where {where}")}
+        partitions = {(r['database_name'], r['table_name'], str(r['PartitionId'])) for r in
+                      self.read(f"select database_name, table_name, PartitionId from meta_partition where {where}")}
+        changed = {(r['database_name'], r['table_name'], str(r['PartitionId'])) for r in rows}
+        deletes = {}
+        for database_name, table_name, partition_id in (stored - partitions) | (stored & changed):
+            deletes.setdefault((database_name, table_name), []).append(partition_id)
+        for (database_name, table_name), partition_ids in deletes.items():
+            self._delete_partitions(meta_table, database_name, table_name, partition_ids)
+        self._flush(meta_table, ordered_map(lambda row: self._show(row, 'tablets_sql'), rows, workers))
+        log.info(f"{meta_table} {len(changed)} partitions changed, {len(stored - partitions)} dropped")
+
+    def collect_tablet(self, meta_table='meta_tablet', workers=None, incremental=False, **kwargs):
         """
         use `show tablets from xxx partition xxx` collect meta  ==> meta_tablet
+        param workers: show statements running at the same time, each on its own pooled fe connection,
+            default and at most mysql_pool_size * fe
+        param incremental: only recollect partitions whose version changed, delete dropped ones
         param **kwargs:
             database_name    filter condition, default None
             table_name       filter condition, default None
         """
-        self._collect(meta_table, 'tablets_sql', **kwargs)
+        self._collect(meta_table, 'tablets_sql', workers, incremental, **kwargs)
 
-    def collect_partition(self, meta_table='meta_partition', **kwargs):
+    def collect_partition(self, meta_table='meta_partition', workers=None, incremental=False, **kwargs):
         """
         use `show partitio from xxx` collect meta  ==> meta_partition
+        param workers: show statements running at the same time, each on its own pooled fe connection,
+            default and at most mysql_pool_size * fe
+        param incremental: only recollect partitions whose version changed, delete dropped ones
         param **kwargs:
             database_name    filter condition, default None
             table_name       filter condition, default None
         """
-        self._collect(meta_table, 'partitions_sql', **kwargs)
+        self._collect(meta_table, 'partitions_sql', workers, incremental, **kwargs)
 
     def _tobyte(self, i):
         size_dict = {
@@ -165,46 +369,109 @@ class DorisMeta(DorisSession):
         else:
             return i
 
-    def collect_size(self, meta_table='meta_size', **kwargs):
-        """
-        use `show data` collect meta  ==> meta_size
-        param **kwargs:
-            database_name    filter condition, default None
-            table_name       filter condition, default None
-        """
-        delete_sql, _ = self._delete_sql(meta_table, **kwargs)
-        database_name = kwargs.get('database_name', '')
-        filter = f" and schema_name='{database_name}'" if database_name else ''
-        sql = f"select schema_name as schema_name from information_schema.schemata where schema_name <> 'information_schema' {filter} order by 1"
-        rows = self.read(sql)
-        data = []
+    def _show_data(self, rows, table_name=None, tables=None):
         for row in rows:
             database_name = row['schema_name']
-            self.execute(f'use {database_name}')
-            items = self.read('show data')
+            # pinned for `use` only, the connection goes back to the pool (and the session database)
+            # before the items are loaded, the pipeline needs one for its `before` statement
+            with self.pin():
+                self.execute(f'use {database_name}')
+                items, data = self.read('show data'), []
             for item in items:
                 if item['TableName'] not in ('Total', 'Quota', 'Left'):
-                    if kwargs.get('table_name') and item['TableName'] != kwargs.get('table_name'):
+                    if table_name and item['TableName'] != table_name:
+                        continue
+                    if tables is not None and (database_name, item['TableName']) not in tables:
                         continue
                     item['database_name'] = database_name
                     item['table_name'] = item.pop('TableName')
                     item['update_time'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
                     item['SizeByte'] = self._tobyte(item['Size'])
                     data.append(item)
-        if data:
-            self.execute(f'use {self.database}')
-            self.execute(delete_sql)
-            self.streamload(meta_table, data)
+            yield data
+
+    _DATA_LENGTH_SQL = "select table_schema, table_name, data_length from information_schema.tables " \
+                       "where table_type = 'BASE TABLE' and `ENGINE` = 'Doris'"
+
+    def _size_bulk(self, database_name=None, table_name=None, tables=None):
+        sql = self._DATA_LENGTH_SQL
+        if database_name:
+            sql += f" and table_schema = '{database_name}'"
+        if table_name:
+            sql += f" and table_name = '{table_name}'"
+        update_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+        data = []
+        for row in self.read(sql):
+            if tables is not None and (row['table_schema'], row['table_name']) not in tables:
+                continue
+            size = int(row['data_length'] or 0)
+            data.append({
+                'database_name': row['table_schema'],
+                'table_name': row['table_name'],
+                'Size': self._tosize(size),
+                'SizeByte': size,
+                'ReplicaCount': None,
+                'update_time': update_time,
+            })
+        return data
+
+    def _tosize(self, i):
+        """
+        bytes in the format of `show data`, eg: 1.500 GB
+        """
+        for key, val in (('PB', 1024 ** 5), ('TB', 1024 ** 4), ('GB', 1024 ** 3), ('MB', 1024 ** 2), ('KB', 1024)):
+            if i >= val:
+                return f'{i / val:.3f} {key}'
+        return f'{i:.3f} '
+
+    def collect_size(self, meta_table='meta_size', incremental=False, bulk=False, **kwargs):
+        """
+        use `show data` collect meta  ==> meta_size
+        param incremental: only recollect tables loaded since their size was collected (by VisibleVersionTime
+            in meta_partition, run collect_partition first), delete tables no longer in meta_partition
+        param bulk: take the size of all tables from information_schema.tables in one query instead of
+            `show data` per database, ReplicaCount is left empty
+        param **kwargs:
+            database_name    filter condition, default None
+            table_name       filter condition, default None
+        """
+        delete_sql, where = self._delete_sql(meta_table, **kwargs)
+        database_name = kwargs.get('database_name', '')
+        filter = f" and schema_name='{database_name}'" if database_name else ''
+        sql = f"select schema_name as schema_name from information_schema.schemata where schema_name <> 'information_schema' {filter} order by 1"
+        tables = None  # tables to recollect, None for all
+        if incremental:
+            sql = MetaSql_size_delta.format(meta_table=meta_table)
+            tables = {(r['database_name'], r['table_name']) for r in self.read(sql.replace('1=1', where or '1=1'))}
+            partitioned = {(r['database_name'], r['table_name']) for r in self.read(
+                f"select distinct database_name, table_name from meta_partition where {where or '1=1'}")}
+            stored = {(r['database_name'], r['table_name']) for r in self.read(
+                f"select distinct database_name, table_name from {meta_table} where {where or '1=1'}")}
+            rows = [{'schema_name': name} for name in sorted({name for name, _ in tables})]
+        if tables is not None:
+            self._delete_tables(meta_table, (stored - partitioned) | (stored & tables))
+            log.info(f"{meta_table} {len(tables)} tables changed, {len(stored - partitioned)} dropped")
+        if bulk and self._supports('tables_data_length', self._DATA_LENGTH_SQL + ' limit 1'):
+            batches = [self._size_bulk(kwargs.get('database_name'), kwargs.get('table_name'), tables)]
+        else:
+            batches = self._show_data(rows if incremental else self.read(sql), kwargs.get('table_name'), tables)
+        self._flush(meta_table, batches, before=None if incremental else delete_sql)
 
-    def collect_table_count(self, meta_table='meta_table_count', **kwargs):
+    def collect_table_count(self, meta_table='meta_table_count', workers=4, query_timeout=None, incremental=False,
+                            **kwargs):
         """
         select count(1) from table  ==> meta_table_count
+        param workers: count queries running at the same time, default 4, at most mysql_pool_size * fe
+        param query_timeout: seconds before a count query is cancelled, default None (session query_timeout)
+        param incremental: skip tables not loaded since their last count (by VisibleVersionTime in meta_partition,
+            run collect_partition first), delete tables no longer counted
         param **kwargs:
             database_name    filter condition, default None
         """
-        delete_sql, _ = self._delete_sql(meta_table, **kwargs)
+        delete_sql, where = self._delete_sql(meta_table, **kwargs)
         filter = f"and table_schema='{kwargs.get('database_name')}'" if kwargs.get('database_name') else ''
-        self.execute(delete_sql)
+        if not incremental:
+            self.execute(delete_sql)
         sql = f"""
         select table_schema, table_name
         from information_schema.tables 
@@ -215,11 +482,31 @@ class DorisMeta(DorisSession):
         limit 10000000
         """
         rows = self.read(sql)
-        items = []
-        for px, row in enumerate(rows, 1):
+        if incremental:
+            where = where or '1=1'
+            counted = {(r['database_name'], r['table_name']): r['update_time'] for r in self.read(
+                f"select database_name, table_name, max(update_time) as update_time from {meta_table} "
+                f"where {where} group by database_name, table_name")}
+            loaded = {(r['database_name'], r['table_name']): r['VisibleVersionTime'] for r in self.read(
+                f"select database_name, table_name, max(VisibleVersionTime) as VisibleVersionTime from meta_partition "
+                f"where {where} group by database_name, table_name")}
+            tables = {(r['table_schema'], r['table_name']) for r in rows}
+            self._delete_tables(meta_table, counted.keys() - tables)
+
+            def changed(key):
+                if key not in counted:
+                    return True
+                return loaded.get(key) is not None and loaded[key] >= counted[key]
+
+            rows = [r for r in rows if changed((r['table_schema'], r['table_name']))]
+            log.info(f"{meta_table} {len(rows)}/{len(tables)} tables changed since last count")
+        workers = self._workers(workers)
+        hint = f"/*+ SET_VAR(query_timeout = {int(query_timeout)}) */" if query_timeout else ''
+
+        def count(row):
             table_schema, table_name = row['table_schema'], row['table_name']
             sql = f"""
-            select a.table_schema as database_name
+            select {hint} a.table_schema as database_name
             ,a.table_name as table_name
             ,a.table_rows as table_rows
             ,s.real_table_rows as real_table_rows
@@ -229,14 +516,41 @@ class DorisMeta(DorisSession):
             where a.table_schema = '{table_schema}'
             and a.table_name = '{table_name}'
             """
-            items += self.read(sql)
-            log.info(f"【{px}/{len(rows)}】{table_schema}.{table_name} count success")
-        self.streamload(meta_table, items)
+            try:
+                return self.read(sql)
+            except Exception as e:
+                log.warning(f"{table_schema}.{table_name} count error, {e}")
+                return None
+
+        def prepare(items):
+            self._delete_tables(meta_table, {(item['database_name'], item['table_name']) for item in items})
+
+        def counts():
+            for px, (row, result) in enumerate(unordered_map(count, rows, workers), 1):
+                if result is not None:
+                    log.info(f"【{px}/{len(rows)}】{row['table_schema']}.{row['table_name']} count success")
+                    yield result
 
-    def collect_materialized_view(self, meta_table='meta_materialized_view', only_insert=False, **kwargs):
+        # counts are slow and small, load what is counted every 30 seconds
+        self._flush(meta_table, counts(), flush_interval=30, prepare=prepare if incremental else None)
+
+    def _delete_tables(self, meta_table, tables):
+        """
+        delete rows of (database_name, table_name) pairs, one delete per database
+        """
+        deletes = {}
+        for database_name, table_name in tables:
+            deletes.setdefault(database_name, []).append(table_name)
+        for database_name, table_names in deletes.items():
+            names = ','.join(f"'{name}'" for name in sorted(table_names))
+            self.execute(f"delete from {meta_table} where database_name='{database_name}' and table_name in ({names})")
+
+    def collect_materialized_view(self, meta_table='meta_materialized_view', only_insert=False, bulk=False, **kwargs):
         """
         use `desc tb all` + `show create materialized view xx on tb`
            ==> materialized_view
+        param bulk: find tables having more than one index with one `show proc '/dbs/<id>'` per database
+            (admin privilege) and only desc those, fall back to desc every table
         param **kwargs:
             database_name    filter condition, default None
         """
@@ -254,25 +568,45 @@ class DorisMeta(DorisSession):
         limit 10000000
         """
         rows = self.read(sql)
+        if bulk:
+            indexed = self._indexed_tables()
+            if indexed is not None:
+                rows = [row for row in rows if (row['table_schema'], row['table_name']) in indexed]
+        self._flush(meta_table, (self._materialized_views(row['table_schema'], row['table_name']) for row in rows))
+
+    def _materialized_views(self, table_schema, table_name):
         items = []
-        for px, row in enumerate(rows, 1):
-            table_schema, table_name = row['table_schema'], row['table_name']
-            sql = f"desc `{table_schema}`.`{table_name}` all"
-            for row in self.read(sql):
-                view_name = row['IndexName']
-                if view_name and row['IndexName'] != table_name and row['IndexKeysType'] == 'AGG_KEYS':
-                    show_sql = f'show create materialized view {view_name} on `{table_schema}`.`{table_name}`'
-                    rows = self.read(show_sql)
-                    if rows:
-                        item = {
-                            'database_name': table_schema,
-                            'table_name': table_name,
-                            'view_name': view_name,
-                            'ddl': rows[0]['CreateStmt'],
-                            'update_time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
-                        }
-                        items.append(item)
-        self.streamload(meta_table, items)
+        for row in self.read(f"desc `{table_schema}`.`{table_name}` all"):
+            view_name = row['IndexName']
+            if view_name and row['IndexName'] != table_name and row['IndexKeysType'] == 'AGG_KEYS':
+                show_sql = f'show create materialized view {view_name} on `{table_schema}`.`{table_name}`'
+                rows = self.read(show_sql)
+                if rows:
+                    item = {
+                        'database_name': table_schema,
+                        'table_name': table_name,
+                        'view_name': view_name,
+                        'ddl': rows[0]['CreateStmt'],
+                        'update_time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+                    }
+                    items.append(item)
+        return items
+
+    def _indexed_tables(self):
+        """
+        return {(database_name, table_name)} of tables with rollups or materialized views, None when unavailable
+        """
+        if not self._supports('show_proc', "show proc '/dbs'"):
+            return None
+        tables = set()
+        for db in self.read("show proc '/dbs'"):
+            database_name = db['DbName'].split(':')[-1]  # default_cluster:db before 1.2
+            if database_name in ('information_schema', '__internal_schema', 'mysql'):
+                continue
+            for table in self.read(f"show proc '/dbs/{db['DbId']}'"):
+                if int(table.get('IndexNum') or 1) > 1:
+                    tables.add((database_name, table['TableName']))
+        return tables
 
     def collect_backup(self, meta_table='meta_backup'):
         """
@@ -290,15 +624,14 @@ class DorisMeta(DorisSession):
                 snapshot, version = i['Snapshot'], i['Timestamp']
                 snapshot_version[snapshot] = version
 
-        rows = self.read('show databases;')
-        items = []
-        for row in rows:
-            database = row['Database']
-            if database == '__internal_schema':
-                continue
-            backups = self.read(f"show backup from {database};")
-            for item in backups:
-                item['backup_timestamp'] = snapshot_version.get(item['SnapshotName'])
-                items.append(item)
+        def backups():
+            for row in self.read('show databases;'):
+                database = row['Database']
+                if database == '__internal_schema':
+                    continue
+                items = self.read(f"show backup from {database};")
+                for item in items:
+                    item['backup_timestamp'] = snapshot_version.get(item['SnapshotName'])
+                yield items
 
-        self.streamload(meta_table, items)
\ No newline at end of file
+        self._flush(meta_table, backups())
\ No newline at end of file
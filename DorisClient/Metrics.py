@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import math
+import socket
+import threading
+from .BaseSession import Logger
+
+log = Logger(name=__name__)
+
+# upper bounds in milliseconds of the latency histograms
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+
+# client stages measured by DorisSession, see LoadResult.client
+CLIENT_STAGES = ('serialize_ms', 'redirect_ms', 'upload_ms', 'elapsed_ms')
+
+# timing fields of the be response
+SERVER_STAGES = ('LoadTimeMs', 'BeginTxnTimeMs', 'StreamLoadPutTimeMs', 'ReadDataTimeMs', 'WriteDataTimeMs',
+                 'CommitAndPublishTimeMs')
+
+
+class Histogram:
+    """
+    latency histogram with fixed upper bounds
+    """
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last one counts values above every bound
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        [(upper bound, values <= bound)], the last bound is +Inf
+        """
+        total, result = 0, []
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class LoadMetrics:
+    """
+    per table counters and latency histograms of stream loads, fed by every session created with it
+
+        metrics = LoadMetrics()
+        metrics.add_hook(StatsdExporter('127.0.0.1', 8125))
+        doris = DorisSession(**doris_cfg, metrics=metrics)
+        doris.streamload('streamload_test', data)
+        print(metrics.prometheus())
+
+    counters: loads by status (success, failed, error for an exception), retries, loaded / filtered / unselected
+    rows and bytes, histograms: client stages (serialize_ms, redirect_ms, upload_ms, elapsed_ms) and the timing
+    fields of the be response (LoadTimeMs, StreamLoadPutTimeMs, ReadDataTimeMs, WriteDataTimeMs, ...)
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        """
+        :param buckets: upper bounds in milliseconds of the histograms
+        """
+        self.buckets = tuple(buckets)
+        self.hooks = []
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """
+        call hook(table, result, error) after every stream load, result is a LoadResult or None when the load raised
+        """
+        self.hooks.append(hook)
+        return hook
+
+    def _table(self, table):
+        metrics = self._tables.get(table)
+        if metrics is None:
+            metrics = self._tables[table] = {
+                'loads': {'success': 0, 'failed': 0, 'error': 0}, 'retries': 0,
+                'rows_loaded': 0, 'rows_filtered': 0, 'rows_unselected': 0, 'bytes': 0,
+                'client': {stage: Histogram(self.buckets) for stage in CLIENT_STAGES},
+                'server': {stage: Histogram(self.buckets) for stage in SERVER_STAGES},
+            }
+        return metrics
+
+    def record(self, table, result=None, error=None, client=None):
+        """
+        count one stream load, client is the client timings of a load that raised
+        """
+        client = result.client if result is not None else client or {}
+        with self._lock:
+            metrics = self._table(table)
+            metrics['retries'] += client.get('retries', 0)
+            if result is None:
+                metrics['loads']['error'] += 1
+            else:
+                metrics['loads']['success' if result else 'failed'] += 1
+                metrics['rows_loaded'] += int(result.get('NumberLoadedRows') or 0)
+                metrics['rows_filtered'] += int(result.get('NumberFilteredRows') or 0)
+                metrics['rows_unselected'] += int(result.get('NumberUnselectedRows') or 0)
+                metrics['bytes'] += int(result.get('LoadBytes') or client.get('body_bytes') or 0)
+                for stage in SERVER_STAGES:
+                    if result.get(stage) is not None:
+                        metrics['server'][stage].observe(float(result[stage]))
+            for stage in CLIENT_STAGES:
+                if client.get(stage) is not None:
+                    metrics['client'][stage].observe(client[stage])
+        for hook in self.hooks:
+            try:
+                hook(table, result, error)
+            except Exception as e:
+                log.warning(f"metrics hook {hook!r} error, {e!r}")
+
+    def snapshot(self):
+        """
+        {table: {loads, retries, rows_loaded, rows_filtered, rows_unselected, bytes, client, server}},
+        a histogram is reported as {count, sum, buckets: [(upper bound, cumulative count)]}
+        """
+        with self._lock:
+            return {table: {
+                key: {stage: {'count': h.count, 'sum': h.sum, 'buckets': h.cumulative()} for stage, h in value.items()}
+                if key in ('client', 'server') else dict(value) if isinstance(value, dict) else value
+                for key, value in metrics.items()} for table, metrics in self._tables.items()}
+
+    def reset(self):
+        with self._lock:
+            self._tables.clear()
+
+    def prometheus(self, prefix='doris_streamload'):
+        """
+        metrics in the prometheus text exposition format
+        """
+        snapshot = self.snapshot()
+        lines = [f'# TYPE {prefix}_loads_total counter']
+        for table, metrics in snapshot.items():
+            for status, count in metrics['loads'].items():
+                lines.append(f'{prefix}_loads_total{{table="{table}",status="{status}"}} {count}')
+        for name in ('retries', 'rows_loaded', 'rows_filtered', 'rows_unselected', 'bytes'):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines += [f'{prefix}_{name}_total{{table="{table}"}} {metrics[name]}'
+                      for table, metrics in snapshot.items()]
+        for kind in ('client', 'server'):
+            name = f'{prefix}_{kind}_milliseconds'
+            lines.append(f'# TYPE {name} histogram')
+            for table, metrics in snapshot.items():
+                for stage, h in metrics[kind].items():
+                    if not h['count']:
+                        continue
+                    labels = f'table="{table}",stage="{stage}"'
+                    for bound, count in h['buckets']:
+                        le = '+Inf' if bound == math.inf else bound
+                        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+                    lines.append(f'{name}_sum{{{labels}}} {h["sum"]:.3f}')
+                    lines.append(f'{name}_count{{{labels}}} {h["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+class StatsdExporter:
+    """
+    LoadMetrics hook sending every stream load to statsd over udp
+
+        metrics.add_hook(StatsdExporter('127.0.0.1', 8125, prefix='doris.streamload'))
+    """
+
+    def __init__(self, host='127.0.0.1', port=8125, prefix='doris.streamload'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def lines(self, table, result=None, error=None):
+        """
+        statsd lines of one stream load
+        """
+        prefix = f'{self.prefix}.{table}'
+        status = 'error' if result is None else 'success' if result else 'failed'
+        lines = [f'{prefix}.loads.{status}:1|c']
+        if result is not None:
+            client = result.client
+            lines += [f'{prefix}.rows_loaded:{int(result.get("NumberLoadedRows") or 0)}|c',
+                      f'{prefix}.bytes:{int(result.get("LoadBytes") or client.get("body_bytes") or 0)}|c']
+            lines += [f'{prefix}.server.{stage}:{result[stage]}|ms' for stage in SERVER_STAGES
+                      if result.get(stage) is not None]
+            lines += [f'{prefix}.client.{stage}:{client[stage]}|ms' for stage in CLIENT_STAGES
+                      if client.get(stage) is not None]
+            if client.get('retries'):
+                lines.append(f'{prefix}.retries:{client["retries"]}|c')
+        return lines
+
+    def __call__(self, table, result=None, error=None):
+        self._socket.sendto('\n'.join(self.lines(table, result, error)).encode('utf-8'), self.address)
+
+    def close(self):
+        self._socket.close()
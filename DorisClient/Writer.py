@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from .BaseSession import Logger
+
+log = Logger(name=__name__)
+
+
+class _Buffer:
+    __slots__ = ('rows', 'bytes', 'row_bytes', 'created')
+
+    def __init__(self):
+        self.rows = []
+        self.bytes = 0
+        self.row_bytes = 0
+        self.created = time.monotonic()
+
+
+class DorisWriter:
+    """
+    Buffer rows per table and stream load them on background workers
+
+    a table buffer is flushed when it holds `max_rows` rows, about `max_bytes` json bytes or is `max_age` seconds old,
+    `write` blocks when buffered and loading data exceeds `max_buffer_bytes`
+
+        with DorisWriter(doris, max_age=5) as writer:
+            writer.write('streamload_test', {'id': 1, 'shop_code': 'sdd1', 'sale_amount': 99})
+    """
+
+    def __init__(self, session, max_rows=100000, max_bytes=64 * 1024 * 1024, max_age=5, workers=4,
+                 max_buffer_bytes=512 * 1024 * 1024, write_timeout=None, ordered=True, on_flush=None, **kwargs):
+        """
+        :param session: DorisSession used to stream load
+        :param max_rows: flush a table buffer when it holds max_rows rows
+        :param max_bytes: flush a table buffer when it holds about max_bytes json bytes
+        :param max_age: flush a table buffer max_age seconds after its first row
+        :param workers: stream loads running at the same time
+        :param max_buffer_bytes: `write` blocks while buffered and loading bytes exceed it
+        :param write_timeout: seconds `write` blocks before raising TimeoutError, default None (wait forever)
+        :param ordered: load the batches of one table one after another, so later rows are loaded later
+        :param on_flush: callable(table, rows, result), called after every flush with the streamload result
+        :param kwargs: streamload kwargs, eg: format='csv', merge_type='MERGE'
+        """
+        self.session = session
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_buffer_bytes = max_buffer_bytes
+        self.write_timeout = write_timeout
+        self.ordered = ordered
+        self.on_flush = on_flush
+        self.kwargs = kwargs
+        self.stats = {'rows': 0, 'flushes': 0, 'failed_flushes': 0, 'failed_rows': 0}
+        self._cond = threading.Condition()
+        self._buffers = {}  # table -> _Buffer being written
+        self._ready = {}  # table -> deque of _Buffer waiting for a worker
+        self._running = {}  # table -> batches loading
+        self._bytes = 0  # buffered and loading bytes
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='DorisWriter')
+        self._ticker = threading.Thread(target=self._tick, name='DorisWriterTicker', daemon=True)
+        self._ticker.start()
+
+    def write(self, table, row):
+        """
+        buffer one dict row for table
+        """
+        with self._cond:
+            if self._closed:
+                raise Exception("DorisWriter is closed")
+            if self._bytes >= self.max_buffer_bytes:
+                for table_name in list(self._buffers):  # free memory as soon as possible
+                    self._seal(table_name)
+                if not self._cond.wait_for(lambda: self._bytes < self.max_buffer_bytes or self._closed,
+                                           self.write_timeout):
+                    raise TimeoutError(f"DorisWriter buffer is full for {self.write_timeout} seconds")
+                if self._closed:  # closed while waiting, the row would never be loaded
+                    raise Exception("DorisWriter is closed")
+            buf = self._buffers.get(table)
+            if buf is None:
+                buf = self._buffers[table] = _Buffer()
+            if len(buf.rows) % 64 == 0:
+                # sample the json size of one row in 64
+                row_bytes = len(json.dumps(row, default=str)) + 1
+                buf.row_bytes = row_bytes if not buf.row_bytes else int(buf.row_bytes * 0.8 + row_bytes * 0.2)
+            buf.rows.append(row)
+            buf.bytes += buf.row_bytes
+            self._bytes += buf.row_bytes
+            self.stats['rows'] += 1
+            if len(buf.rows) >= self.max_rows or buf.bytes >= self.max_bytes:
+                self._seal(table)
+
+    def write_many(self, table, rows):
+        for row in rows:
+            self.write(table, row)
+
+    def _seal(self, table):
+        self._ready.setdefault(table, deque()).append(self._buffers.pop(table))
+        self._dispatch(table)
+
+    def _dispatch(self, table):
+        ready = self._ready.get(table)
+        while ready and not (self.ordered and self._running.get(table)):
+            self._running[table] = self._running.get(table, 0) + 1
+            self._executor.submit(self._load, table, ready.popleft())
+        if not ready:
+            self._ready.pop(table, None)
+
+    def _load(self, table, buf):
+        try:
+            result = self.session.streamload(table, buf.rows, **self.kwargs)
+        except Exception as e:
+            log.error(f"{table} flush {len(buf.rows)} rows error, {e}")
+            result = False
+        if self.on_flush:
+            try:
+                self.on_flush(table, len(buf.rows), result)
+            except Exception as e:
+                log.error(f"{table} on_flush callback error, {e}")
+        with self._cond:
+            self.stats['flushes'] += 1
+            if not result:
+                self.stats['failed_flushes'] += 1
+                self.stats['failed_rows'] += len(buf.rows)
+            self._bytes -= buf.bytes
+            self._running[table] -= 1
+            if not self._running[table]:
+                del self._running[table]
+            self._dispatch(table)
+            self._cond.notify_all()
+
+    def _tick(self):
+        interval = max(min(self.max_age / 4, 1), 0.05)
+        while True:
+            with self._cond:
+                if self._cond.wait_for(lambda: self._closed, interval):
+                    return
+                now = time.monotonic()
+                for table in [t for t, buf in self._buffers.items() if now - buf.created >= self.max_age]:
+                    self._seal(table)
+
+    def flush(self, timeout=None):
+        """
+        load all buffered rows and wait until every loading batch is finished
+        """
+        with self._cond:
+            for table in list(self._buffers):
+                self._seal(table)
+            if not self._cond.wait_for(lambda: not self._ready and not self._running, timeout):
+                raise TimeoutError(f"DorisWriter flush is not finished in {timeout} seconds")
+
+    def close(self):
+        """
+        flush and stop the background workers, `write` raises after close
+        """
+        with self._cond:
+            if self._closed:
+                return
+            # closed while the last buffers are sealed, a concurrent write raises instead of staying buffered
+            self._closed = True
+            for table in list(self._buffers):
+                self._seal(table)
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: not self._ready and not self._running)
+        self._ticker.join()
+        self._executor.shutdown(wait=True)
+        log.info(f"DorisWriter closed, {self.stats}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
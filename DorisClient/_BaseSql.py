@@ -47,6 +47,78 @@ order by 1,2
 limit 100000000
 """
 
+# partitions whose tablets are missing or older than the partition visible version
+MetaSql_tablets_delta = """
+select *
+from(
+select p.database_name
+,p.table_name
+,p.PartitionId
+,p.PartitionName
+,concat('show tablets from `',p.database_name,'`.`',p.table_name,'` partition `',p.PartitionName, '`') as tablets_sql
+from meta_partition p
+left join (
+    select database_name, table_name, PartitionId, min(Version) as Version
+    from {meta_table}
+    group by database_name, table_name, PartitionId
+) t on p.database_name = t.database_name and p.table_name = t.table_name and p.PartitionId = t.PartitionId
+where t.Version is null or t.Version <> p.VisibleVersion
+) s
+where 1=1
+order by 1,2
+limit 100000000
+"""
+
+# tables loaded since their size was collected
+MetaSql_size_delta = """
+select p.database_name
+,p.table_name
+from (
+    select database_name, table_name, max(VisibleVersionTime) as VisibleVersionTime
+    from meta_partition
+    where 1=1
+    group by database_name, table_name
+) p
+left join (
+    select database_name, table_name, min(update_time) as update_time
+    from {meta_table}
+    group by database_name, table_name
+) s on p.database_name = s.database_name and p.table_name = s.table_name
+where s.update_time is null or p.VisibleVersionTime >= s.update_time
+limit 100000000
+"""
+
+# one replica data size and tablet size spread of every partition, from collected meta
+MetaSql_partition_size = """
+select *
+from(
+select p.database_name
+,p.table_name
+,p.PartitionName as partition_name
+,p.PartitionKey as partition_key
+,p.DistributionKey as distribution_key
+,p.Buckets as buckets
+,t.tablets
+,t.size
+,t.max_size
+,t.std_size
+from meta_partition p
+join (
+    select database_name, table_name, PartitionId
+    ,count(1) as tablets, sum(size) as size, max(size) as max_size, stddev_pop(size) as std_size
+    from (
+        select database_name, table_name, PartitionId, TabletId, max(DataSize) as size
+        from meta_tablet
+        group by database_name, table_name, PartitionId, TabletId
+    ) r
+    group by database_name, table_name, PartitionId
+) t on p.database_name = t.database_name and p.table_name = t.table_name and p.PartitionId = t.PartitionId
+) s
+where 1=1
+order by 1,2,3
+limit 100000000
+"""
+
 
 MetaDDL_Table = """
 CREATE TABLE IF NOT EXISTS `meta_table` (
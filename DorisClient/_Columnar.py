@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+from array import array
+from pymysql.constants import FIELD_TYPE
+
+try:
+    import numpy
+except ImportError:  # pip install numpy
+    numpy = None
+
+# mysql field type -> array typecode, other types are kept in a list of python values
+TYPECODES = {
+    FIELD_TYPE.TINY: 'q',
+    FIELD_TYPE.SHORT: 'q',
+    FIELD_TYPE.INT24: 'q',
+    FIELD_TYPE.LONG: 'q',
+    FIELD_TYPE.LONGLONG: 'q',
+    FIELD_TYPE.FLOAT: 'd',
+    FIELD_TYPE.DOUBLE: 'd',
+}
+
+NUMPY_DTYPES = {'q': 'int64', 'd': 'float64'}
+
+
+class ColumnarResult:
+    """
+    query result kept column by column
+
+        result.names                 column names
+        result['id'], result[0]      values of a column
+        len(result)                  number of rows
+    """
+
+    def __init__(self, names, columns):
+        self.names = names
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, key):
+        return self.columns[key if isinstance(key, int) else self.names.index(key)]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def items(self):
+        return zip(self.names, self.columns)
+
+    def rows(self):
+        """
+        iterate the result as tuples
+        """
+        return zip(*self.columns)
+
+    def to_dicts(self):
+        return [dict(zip(self.names, row)) for row in self.rows()]
+
+    def to_numpy(self):
+        """
+        return a new ColumnarResult of numpy arrays, typed arrays are shared without copy
+        """
+        assert numpy, 'to_numpy requires `pip install numpy`'
+        columns = []
+        for column in self.columns:
+            if isinstance(column, array):
+                columns.append(numpy.frombuffer(column, dtype=NUMPY_DTYPES[column.typecode]))
+            elif isinstance(column, numpy.ndarray):
+                columns.append(column)
+            else:
+                data = numpy.empty(len(column), dtype=object)
+                data[:] = column
+                columns.append(data)
+        return ColumnarResult(self.names, columns)
+
+    def to_pandas(self):
+        """
+        return a pandas DataFrame, requires `pip install pandas`
+        """
+        import pandas
+        result = self.to_numpy() if numpy else self
+        return pandas.DataFrame({name: column for name, column in result.items()}, columns=self.names)
+
+    def __repr__(self):
+        return f"ColumnarResult(names={self.names}, rows={len(self)})"
+
+
+def _append(column, values, typecode):
+    """
+    append a batch of values to a column, return the column, an int column holding NULL or a value out of int64
+    turns into a list, NULL of a float column is stored as nan
+    """
+    if isinstance(column, array):
+        if None in values:
+            if typecode == 'd':
+                values = [float('nan') if v is None else v for v in values]
+            else:
+                column = list(column)
+        if isinstance(column, array):
+            try:
+                column.extend(array(typecode, values))
+                return column
+            except (TypeError, OverflowError):
+                column = list(column)
+    column.extend(values)
+    return column
+
+
+def columnar(cursor, batch_size=10000, numpy_arrays=False):
+    """
+    fetch an executed cursor of tuple rows into a ColumnarResult, batch_size rows at a time
+    """
+    if not cursor.description:
+        return ColumnarResult([], [])
+    names = [d[0] for d in cursor.description]
+    typecodes = [TYPECODES.get(d[1]) for d in cursor.description]
+    columns = [array(typecode) if typecode else [] for typecode in typecodes]
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for i, values in enumerate(zip(*rows)):
+            columns[i] = _append(columns[i], values, typecodes[i])
+    result = ColumnarResult(names, columns)
+    return result.to_numpy() if numpy_arrays else result
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+ENGINE = re.compile(r'ENGINE=(\w+)')
+MODEL = re.compile(r'^(DUPLICATE|UNIQUE|AGGREGATE) KEY\((.*?)\)\s*$', re.M)
+DISTRIBUTION = re.compile(r'DISTRIBUTED BY (.*?) BUCKETS (\d+|AUTO)')
+PARTITION_BY = re.compile(r'^(?:AUTO )?PARTITION BY (RANGE|LIST)\s*\((.*?)\)', re.M)
+PARTITION = re.compile(r'PARTITION (\S+) (VALUES .*)[,)\]]\s*$', re.M)
+PROPERTIES = re.compile(r'^PROPERTIES \((.*)\)', re.S | re.M)
+PROPERTY = re.compile(r'"((?:[^"\\]|\\.)*)" = "((?:[^"\\]|\\.)*)"')
+DYNAMIC_BUCKETS = re.compile(r'"dynamic_partition\.buckets" = "\d+"')
+REPLICATION = re.compile(r'tag\.location\.[^,]+: (\d+)')
+NAME = re.compile(r'`([^`]+)`|([^\s,`]+)')
+
+CACHE_SIZE = 4096
+
+
+def _names(text):
+    return [quoted or plain for quoted, plain in NAME.findall(text)]
+
+
+class TableDDL:
+    """
+    structured view of a `show create table` statement, shared by every caller, treat it as read-only
+
+        engine                OLAP, ...
+        model                 DUPLICATE, UNIQUE, AGGREGATE
+        keys                  key columns
+        distribution_type     HASH, RANDOM
+        distribution_key      hash columns
+        buckets               int, None for BUCKETS AUTO
+        partition_type        RANGE, LIST, None
+        partition_columns     partition columns
+        partitions            {partition name: `VALUES ...` clause}
+        properties            {name: value}
+        replication_num       replicas over all tags
+    """
+
+    __slots__ = ('engine', 'model', 'keys', 'distribution_type', 'distribution_key', 'buckets', 'partition_type',
+                 'partition_columns', 'partitions', 'properties', 'replication_num')
+
+    def __init__(self, ddl):
+        engine = ENGINE.search(ddl)
+        self.engine = engine.group(1) if engine else ''
+
+        model = MODEL.search(ddl)
+        self.model = model.group(1) if model else ''
+        self.keys = _names(model.group(2)) if model else []
+
+        distribution = DISTRIBUTION.search(ddl)
+        if distribution:
+            method = distribution.group(1).strip()
+            self.distribution_type = 'RANDOM' if method.upper() == 'RANDOM' else 'HASH'
+            self.distribution_key = _names(method[method.find('(') + 1:method.rfind(')')]) \
+                if self.distribution_type == 'HASH' else []
+            self.buckets = int(distribution.group(2)) if distribution.group(2).isdigit() else None
+        else:
+            self.distribution_type, self.distribution_key, self.buckets = '', [], None
+
+        partition_by = PARTITION_BY.search(ddl)
+        self.partition_type = partition_by.group(1) if partition_by else None
+        self.partition_columns = _names(partition_by.group(2)) if partition_by else []
+        self.partitions = {name.strip('`'): values for name, values in PARTITION.findall(ddl)} \
+            if partition_by else {}
+
+        properties = PROPERTIES.search(ddl)
+        self.properties = dict(PROPERTY.findall(properties.group(1))) if properties else {}
+        replication = REPLICATION.findall(self.properties.get('replication_allocation', ''))
+        self.replication_num = sum(int(i) for i in replication) if replication \
+            else int(self.properties.get('replication_num') or 0)
+
+    @property
+    def distribution(self):
+        """
+        distribution as written after DISTRIBUTED BY, eg: HASH(`id`, `shop_code`), RANDOM
+        """
+        if self.distribution_type == 'HASH':
+            return 'HASH(' + ', '.join(f'`{key}`' for key in self.distribution_key) + ')'
+        return self.distribution_type
+
+    def meta(self):
+        """
+        fields of meta_table
+        """
+        return {
+            'engine': self.engine,
+            'model': self.model,
+            'replication_num': self.replication_num,
+            'bucket_num': self.buckets or 0,
+            'properties': json.dumps(self.properties),
+        }
+
+
+_cache = OrderedDict()  # md5 of ddl -> TableDDL
+_lock = threading.Lock()
+
+
+def parse_ddl(ddl):
+    """
+    parse a create table statement, results are memoized by the ddl hash
+    """
+    key = hashlib.md5(ddl.encode('utf-8')).digest()
+    with _lock:
+        table = _cache.get(key)
+        if table is not None:
+            _cache.move_to_end(key)
+            return table
+    table = TableDDL(ddl)
+    with _lock:
+        _cache[key] = table
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return table
+
+
+def replace_distribution(ddl, distribution, buckets):
+    """
+    return ddl with a new DISTRIBUTED BY clause and dynamic_partition.buckets
+    """
+    ddl = DISTRIBUTION.sub(f'DISTRIBUTED BY {distribution} BUCKETS {buckets}', ddl, count=1)
+    return DYNAMIC_BUCKETS.sub(f'"dynamic_partition.buckets" = "{buckets}"', ddl)
+
+
+def remove_properties(ddl, names):
+    """
+    return ddl without the properties in names, the last property of the clause takes the comma before it along
+    """
+    for name in names:
+        prop = rf'"{re.escape(name.strip())}" = "(?:[^"\\]|\\.)*"'
+        ddl = re.sub(rf'{prop},\s*', '', ddl)
+        ddl = re.sub(rf',\s*{prop}(?=\s*\))', '', ddl)
+    return ddl
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import bz2
+import json
+import zlib
+import itertools
+
+try:
+    import lz4.frame
+except ImportError:  # pip install lz4
+    lz4 = None
+
+try:
+    import zstandard
+except ImportError:  # pip install zstandard
+    zstandard = None
+
+BUFFER_SIZE = 1024 * 1024  # bytes handed to the http layer at a time
+
+
+def is_stream(source):
+    """
+    source that can only be consumed once: generator, iterator, file-like object
+    """
+    return not isinstance(source, (list, tuple))
+
+
+def _to_bytes(block):
+    return block.encode('utf-8') if isinstance(block, str) else block
+
+
+def _buffered(blocks, buffer_size):
+    buffer, size = [], 0
+    for block in blocks:
+        buffer.append(block)
+        size += len(block)
+        if size >= buffer_size:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def json_lines(rows, buffer_size=BUFFER_SIZE):
+    """
+    encode dict rows incrementally as json lines
+    """
+    return _buffered((json.dumps(row).encode('utf-8') + b'\n' for row in rows), buffer_size)
+
+
+def _file_blocks(first_line, fileobj, buffer_size):
+    yield first_line
+    while True:
+        block = fileobj.read(buffer_size)
+        if not block:
+            return
+        yield _to_bytes(block)
+
+
+def _csv_field(value, specials, enclose, escape):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        value = '1' if value else '0'
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif not isinstance(value, str):
+        return str(value)
+    if any(c in value for c in specials):
+        if not enclose:
+            raise ValueError(f"value {value!r} contains csv separator, set `enclose` to load it")
+        value = value.replace(escape, escape + escape).replace(enclose, escape + enclose)
+        return f'{enclose}{value}{enclose}'
+    return value
+
+
+def csv_lines(rows, columns, column_separator='\t', line_delimiter='\n', enclose='"', escape='\\',
+              with_names=False, buffer_size=BUFFER_SIZE):
+    """
+    encode dict rows incrementally as csv in the order of columns, None is written as \\N,
+    values containing a separator are enclosed and the enclose char inside is escaped
+    """
+    specials = [column_separator, line_delimiter, '\r', '\n'] + ([enclose] if enclose else [])
+
+    def lines():
+        if with_names:
+            yield (column_separator.join(columns) + line_delimiter).encode('utf-8')
+        for row in rows:
+            fields = [_csv_field(row.get(column), specials, enclose, escape) for column in columns]
+            yield (column_separator.join(fields) + line_delimiter).encode('utf-8')
+
+    return _buffered(lines(), buffer_size)
+
+
+class _Compressor:
+
+    def __init__(self, compress, flush, begin=b''):
+        self.compress, self.flush, self.begin = compress, flush, begin
+
+
+def _compressor(compress_type, level=None):
+    if compress_type == 'gz':
+        c = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)  # 31: gzip header
+        return _Compressor(c.compress, c.flush)
+    if compress_type == 'deflate':
+        c = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 15)  # 15: zlib header
+        return _Compressor(c.compress, c.flush)
+    if compress_type == 'bz2':
+        c = bz2.BZ2Compressor(9 if level is None else level)
+        return _Compressor(c.compress, c.flush)
+    if compress_type == 'lz4':
+        assert lz4, 'compress_type lz4 requires `pip install lz4`'
+        c = lz4.frame.LZ4FrameCompressor(compression_level=level or 0)
+        return _Compressor(c.compress, c.flush, c.begin())
+    if compress_type == 'zstd':
+        assert zstandard, 'compress_type zstd requires `pip install zstandard`'
+        c = zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+        return _Compressor(c.compress, c.flush)
+    raise ValueError(f'unsupported compress_type {compress_type}, support: {", ".join(COMPRESS_TYPES)}')
+
+
+COMPRESS_TYPES = ('gz', 'deflate', 'bz2', 'lz4', 'zstd')
+
+
+def compress(body, compress_type, level=None):
+    """
+    compress a body returned by encode, str/bytes body is compressed at once,
+    generator body is compressed block by block as it is streamed
+
+    :param compress_type: gz, deflate, bz2, lz4, zstd
+    :param level: codec compression level, default: codec default
+    """
+    c = _compressor(compress_type, level)
+    if isinstance(body, (str, bytes)):
+        return c.begin + c.compress(_to_bytes(body)) + c.flush()
+
+    def blocks():
+        if c.begin:
+            yield c.begin
+        for block in body:
+            block = c.compress(block)
+            if block:
+                yield block
+        yield c.flush()
+
+    return blocks()
+
+
+def header_value(value):
+    """
+    separators are sent as hex (eg: \\x01) when they can not be put in a http header as they are
+    """
+    if value.isprintable() and '\\' not in value:
+        return value
+    return ''.join(f'\\x{b:02x}' for b in value.encode('utf-8'))
+
+
+def _row_bytes(rows):
+    if isinstance(rows[0], (str, bytes)):
+        return max(sum(len(row) for row in rows) / len(rows), 1)
+    return max(len(json.dumps(rows)) / len(rows), 1)
+
+
+def chunks(source, chunk_rows=None, chunk_bytes=None, header=False):
+    """
+    split source into lists of at most chunk_rows rows and about chunk_bytes json bytes,
+    the row size is estimated from the first rows of every chunk
+
+    a file-like source is split on line boundaries, its chunks are lists of lines sent as they are,
+    blank lines are dropped, `header` repeats the first line (csv_with_names) at the head of every chunk
+    """
+    rows = (line for line in source if line.strip()) if hasattr(source, 'read') else iter(source)
+    first = [next(rows, None)] if header else []
+    if first == [None]:
+        return
+    while True:
+        size = chunk_rows
+        if chunk_bytes:
+            sample = list(itertools.islice(rows, 64 if not chunk_rows else min(64, chunk_rows)))
+            if not sample:
+                return
+            size = max(int(chunk_bytes / _row_bytes(sample)), len(sample))
+            size = min(size, chunk_rows) if chunk_rows else size
+            chunk = sample + list(itertools.islice(rows, size - len(sample)))
+        else:
+            chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield first + chunk
+
+
+def is_lines(source):
+    """
+    chunk of a file-like source: list of str / bytes lines
+    """
+    return isinstance(source, (list, tuple)) and bool(source) and isinstance(source[0], (str, bytes))
+
+
+def _lines_body(lines):
+    return b''.join(line if line.endswith(b'\n') else line + b'\n' for line in map(_to_bytes, lines) if line.strip())
+
+
+def stream_body(source, buffer_size=BUFFER_SIZE):
+    """
+    return (columns, body) for a source that is sent with chunked transfer-encoding
+        columns: keys of the first row, None when source is empty
+        body: generator of json lines bytes
+
+    :param source: iterable of dict, or file-like object with one json object per line
+    :param buffer_size: bytes per chunk of the request body
+    """
+    if hasattr(source, 'read'):
+        first_line = _to_bytes(source.readline())
+        if not first_line.strip():
+            return None, None
+        if not first_line.endswith(b'\n'):
+            first_line += b'\n'
+        columns = list(json.loads(first_line).keys())
+        return columns, _file_blocks(first_line, source, buffer_size)
+    rows = iter(source)
+    first = next(rows, None)
+    if first is None:
+        return None, None
+    return list(first.keys()), json_lines(itertools.chain([first], rows), buffer_size)
+
+
+def encode(source, format='json', columns=None, column_separator='\t', line_delimiter='\n', enclose='"',
+           escape='\\', buffer_size=BUFFER_SIZE):
+    """
+    return (columns, body, headers) of a stream load request
+        columns: column names sent in the `columns` header, None when source is empty
+        body: str/bytes for list source, generator of bytes for one-shot source
+        headers: format related stream load headers
+
+    :param source: dict list, iterable of dict, file-like object (json lines or csv text),
+                   or list of lines of a file-like object split by `chunks`
+    :param format: json, csv, csv_with_names
+    :param columns: column order, default: keys of the first row
+    """
+    assert format in ('json', 'csv', 'csv_with_names'), f'unsupported format {format}'
+    stream = is_stream(source)
+    lines = is_lines(source)
+    if format == 'json':
+        headers = {'format': 'json', 'fuzzy_parse': 'true'}
+        if lines:
+            headers['read_json_by_line'] = 'true'
+            body = _lines_body(source)
+            keys = list(json.loads(body[:body.index(b'\n')]).keys()) if body else None
+        elif stream:
+            headers['read_json_by_line'] = 'true'
+            keys, body = stream_body(source, buffer_size)
+        else:
+            headers['strip_outer_array'] = 'true'
+            keys, body = (list(source[0].keys()), json.dumps(source)) if source else (None, None)
+        return ((columns or keys) if keys else None), body, headers
+
+    headers = {
+        'format': format,
+        'column_separator': header_value(column_separator),
+        'line_delimiter': header_value(line_delimiter),
+    }
+    if enclose:
+        headers['enclose'] = enclose
+        headers['escape'] = escape
+    if lines:
+        return columns or [], _lines_body(source), headers
+    if hasattr(source, 'read'):
+        first = _to_bytes(source.read(buffer_size))
+        if not first:
+            return None, None, headers
+        return columns or [], _file_blocks(first, source, buffer_size), headers
+    rows = iter(source)
+    first = next(rows, None)
+    if first is None:
+        return None, None, headers
+    columns = list(columns or first.keys())
+    body = csv_lines(itertools.chain([first], rows), columns, column_separator, line_delimiter, enclose, escape,
+                     format == 'csv_with_names', buffer_size)
+    if not stream:
+        body = b''.join(body)
+    return columns, body, headers
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import json
+import time
+import queue
+import threading
+from ._Log import Logger
+
+log = Logger(name=__name__)
+
+
+class Pipeline:
+    """
+    fetch and load stages of a collector running at the same time
+
+    the fetch stage `put`s lists of rows into a bounded queue, a loader thread drains it and stream loads
+    a batch every `flush_bytes` json bytes (row size sampled as rows arrive) or `flush_interval` seconds
+
+        with Pipeline(session, 'meta_partition', before='truncate table meta_partition') as pipeline:
+            for rows in fetch():
+                pipeline.put(rows)
+    """
+
+    def __init__(self, session, table, flush_bytes=16 * 1024 * 1024, flush_interval=None, queue_size=8,
+                 before=None, prepare=None, **kwargs):
+        """
+        :param session: DorisSession used to stream load
+        :param table: table loaded
+        :param flush_bytes: load a batch once it holds about flush_bytes json bytes
+        :param flush_interval: load a batch flush_interval seconds after its first row, default None (by bytes only)
+        :param queue_size: lists of rows waiting for the loader, `put` blocks when the queue is full
+        :param before: sql executed once before the first load, not executed when nothing is loaded
+        :param prepare: callable(rows), called before each load with the rows of the batch
+        :param kwargs: streamload kwargs
+        """
+        self.session = session
+        self.table = table
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.before = before
+        self.prepare = prepare
+        self.kwargs = kwargs
+        self.stats = {'rows': 0, 'flushes': 0, 'fetch': 0.0, 'wait': 0.0, 'load': 0.0, 'elapsed': 0.0}
+        self.error = None
+        self._queue = queue.Queue(queue_size)
+        self._abort = False
+        self._start = self._last = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=f'Pipeline-{table}', daemon=True)
+        self._thread.start()
+
+    def put(self, rows):
+        """
+        hand a list of rows to the loader, blocks while the queue is full
+        """
+        if self.error:
+            raise self.error
+        now = time.monotonic()
+        self.stats['fetch'] += now - self._last
+        if rows:
+            self._queue.put(rows)
+        self._last = time.monotonic()
+        self.stats['wait'] += self._last - now
+
+    def _run(self):
+        batch, size, row_bytes, first = [], 0, 0, None
+        while True:
+            timeout = None if first is None or not self.flush_interval else \
+                max(first + self.flush_interval - time.monotonic(), 0)
+            try:
+                rows = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                rows = []
+            if rows is None:
+                break
+            if self.error or self._abort:
+                continue  # keep draining so `put` never blocks forever
+            try:
+                for i, row in enumerate(rows):
+                    if not row_bytes or i % 64 == 0:
+                        sample = len(json.dumps(row, default=str)) + 1
+                        row_bytes = sample if not row_bytes else int(row_bytes * 0.8 + sample * 0.2)
+                    size += row_bytes
+                batch += rows
+                if rows and first is None:
+                    first = time.monotonic()
+                if batch and (size >= self.flush_bytes or
+                              (self.flush_interval and time.monotonic() - first >= self.flush_interval)):
+                    self._load(batch)
+                    batch, size, first = [], 0, None
+            except Exception as e:
+                self.error = e
+        if batch and not self.error and not self._abort:
+            try:
+                self._load(batch)
+            except Exception as e:
+                self.error = e
+
+    def _load(self, rows):
+        start = time.monotonic()
+        if self.before:
+            self.session.execute(self.before)
+            self.before = None
+        if self.prepare:
+            self.prepare(rows)
+        if not self.session.streamload(self.table, rows, **self.kwargs):
+            raise Exception("streamload error !!!")
+        self.stats['rows'] += len(rows)
+        self.stats['flushes'] += 1
+        self.stats['load'] += time.monotonic() - start
+
+    def close(self, abort=False):
+        """
+        load what is left and wait for the loader, `abort` drops rows not loaded yet
+        """
+        if self._thread.is_alive():
+            self.stats['fetch'] += time.monotonic() - self._last
+            self._abort = abort
+            self._queue.put(None)
+            self._thread.join()
+            self.stats['elapsed'] = time.monotonic() - self._start
+            log.info(f"{self.table} {self.stats['rows']} rows in {self.stats['flushes']} loads, "
+                     f"fetch {self.stats['fetch']:.1f}s (blocked {self.stats['wait']:.1f}s), "
+                     f"load {self.stats['load']:.1f}s, elapsed {self.stats['elapsed']:.1f}s")
+        if self.error and not abort:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(abort=exc_type is not None)
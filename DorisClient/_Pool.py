@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import time
+import threading
+import pymysql
+from ._Log import Logger
+
+log = Logger(name=__name__)
+
+# mysql client errors meaning the connection is unusable:
+# can't connect, server has gone away, lost connection during query, lost connection to server
+CONNECTION_ERRORS = (2003, 2006, 2013, 2055)
+
+
+def is_connection_error(e):
+    if isinstance(e, pymysql.err.InterfaceError):
+        return True
+    return isinstance(e, pymysql.err.OperationalError) and bool(e.args) and e.args[0] in CONNECTION_ERRORS
+
+
+class _Host:
+    __slots__ = ('host', 'idle', 'busy', 'down_until')
+
+    def __init__(self, host):
+        self.host = host
+        self.idle = []  # [(connection, last used)]
+        self.busy = 0
+        self.down_until = 0
+
+
+class ConnectionPool:
+    """
+    Thread-safe pymysql connection pool over all fe, bounded per fe
+
+    balance:
+        least_busy     pick the fe with the fewest connections in use
+        round_robin    pick fe one after another
+    """
+
+    def __init__(self, hosts, max_per_host=4, balance='least_busy', ping_interval=30, acquire_timeout=None,
+                 down_seconds=30, **mysql_cfg):
+        """
+        :param hosts: fe hosts list
+        :param max_per_host: max connections per fe
+        :param balance: least_busy, round_robin
+        :param ping_interval: ping a connection idle for more than ping_interval seconds before using it
+        :param acquire_timeout: seconds to wait for a free connection, default None (wait forever)
+        :param down_seconds: seconds to skip a fe after failing to connect to it
+        :param mysql_cfg: pymysql.connect kwargs except host
+        """
+        assert balance in ('least_busy', 'round_robin'), f'unsupported balance {balance}'
+        self.hosts = [_Host(host) for host in dict.fromkeys(hosts)]
+        self.max_per_host = max_per_host
+        self.capacity = max_per_host * len(self.hosts)  # connections open at most
+        self.balance = balance
+        self.ping_interval = ping_interval
+        self.acquire_timeout = acquire_timeout
+        self.down_seconds = down_seconds
+        self.mysql_cfg = mysql_cfg
+        self._cond = threading.Condition()
+        self._owner = {}  # connection -> _Host
+        self._cursor = 0
+        self._closed = False
+
+    def _pick(self):
+        now = time.monotonic()
+        free = [h for h in self.hosts if h.busy < self.max_per_host]
+        up = [h for h in free if h.down_until <= now]
+        if not up and free and all(h.down_until > now for h in self.hosts):
+            up = [min(free, key=lambda h: h.down_until)]  # every fe is down, try the first to recover
+        if not up:
+            return None
+        self._cursor = (self._cursor + 1) % len(self.hosts)
+        if self.balance == 'round_robin':
+            return min(up, key=lambda h: (self.hosts.index(h) - self._cursor) % len(self.hosts))
+        return min(up, key=lambda h: (h.busy - len(h.idle) / (self.max_per_host + 1),
+                                      (self.hosts.index(h) - self._cursor) % len(self.hosts)))
+
+    def _wait_host(self, deadline, timeout=None):
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise Exception("ConnectionPool is closed")
+                host = self._pick()
+                if host:
+                    host.busy += 1
+                    return host, (host.idle.pop() if host.idle else (None, 0))
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    raise TimeoutError(f"no free doris connection in {timeout} seconds")
+                self._cond.wait(left if left is not None else 1)
+
+    def acquire(self, timeout=None):
+        """
+        return a connection owned by the caller until `release`
+
+        :param timeout: seconds to wait for a free connection before TimeoutError, default acquire_timeout
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        error = None
+        for _ in range(len(self.hosts) + 1):
+            host, (conn, last_used) = self._wait_host(deadline, timeout)
+            try:
+                if conn is None:
+                    conn = pymysql.connect(host=host.host, **self.mysql_cfg)
+                elif time.monotonic() - last_used > self.ping_interval:
+                    conn.ping(reconnect=True)
+            except Exception as e:
+                log.warning(f"connect fe {host.host} fail, {e}")
+                error = e
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        ...
+                with self._cond:
+                    host.busy -= 1
+                    host.down_until = time.monotonic() + self.down_seconds
+                    self._owner.pop(conn, None)
+                    self._cond.notify()
+                continue
+            with self._cond:
+                self._owner[conn] = host
+            return conn
+        raise error
+
+    def release(self, conn, discard=False, database=None):
+        """
+        give the connection back, `discard` closes it, `database` switches it back to the default database
+        """
+        if database and not discard:
+            try:
+                conn.select_db(database)
+            except Exception:
+                discard = True
+        with self._cond:
+            host = self._owner.get(conn)
+            if host is None:
+                return
+            host.busy -= 1
+            if discard:
+                # other idle connections of the fe are likely broken too, ping them before reuse
+                host.idle = [(idle, 0) for idle, _ in host.idle]
+            if discard or self._closed:
+                del self._owner[conn]
+                try:
+                    conn.close()
+                except Exception:
+                    ...
+            else:
+                host.idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def free(self):
+        """
+        connections that can be acquired without waiting, on fe not marked down
+        """
+        with self._cond:
+            now = time.monotonic()
+            return sum(self.max_per_host - h.busy for h in self.hosts if h.down_until <= now)
+
+    def stats(self):
+        with self._cond:
+            return {h.host: {'busy': h.busy, 'idle': len(h.idle), 'down': h.down_until > time.monotonic()}
+                    for h in self.hosts}
+
+    def close(self):
+        """
+        close idle connections, connections in use are closed when released
+        """
+        with self._cond:
+            self._closed = True
+            for host in self.hosts:
+                for conn, _ in host.idle:
+                    self._owner.pop(conn, None)
+                    try:
+                        conn.close()
+                    except Exception:
+                        ...
+                host.idle.clear()
+            self._cond.notify_all()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import time
+import threading
+from ._Log import Logger
+
+log = Logger(name=__name__)
+
+
+class FeRouter:
+    """
+    Track fe health and cache the be redirect (`Location`) of each table for stream load
+
+    fe state:
+        closed    fe is healthy, used in round-robin order
+        open      fe failed `fail_threshold` times in a row, skipped until the background probe succeeds
+    """
+
+    def __init__(self, fe_servers, redirect_ttl=30, fail_threshold=1, probe_interval=5, probe=None):
+        """
+        :param fe_servers: fe servers list, like: ['127.0.0.1:8030', '127.0.0.2:8030']
+        :param redirect_ttl: seconds to reuse a resolved be location of a table, 0 to disable the cache
+        :param fail_threshold: consecutive failures before a fe is marked down
+        :param probe_interval: seconds between background probes of down fe
+        :param probe: callable(fe_server) -> bool, used to check whether a down fe is back
+        """
+        self.fe_servers = list(fe_servers)
+        self.redirect_ttl = redirect_ttl
+        self.fail_threshold = max(fail_threshold, 1)
+        self.probe_interval = probe_interval
+        self.probe = probe
+        self._lock = threading.Lock()
+        self._cursor = 0
+        self._fails = {fe_server: 0 for fe_server in self.fe_servers}
+        self._down = set()
+        self._locations = {}  # table -> (location, expire_at)
+        self._prober = None
+
+    def candidates(self):
+        """
+        return fe servers to try, healthy ones first in round-robin order, down ones last
+        """
+        with self._lock:
+            self._cursor = (self._cursor + 1) % len(self.fe_servers)
+            rotated = self.fe_servers[self._cursor:] + self.fe_servers[:self._cursor]
+            healthy = [fe_server for fe_server in rotated if fe_server not in self._down]
+            down = [fe_server for fe_server in rotated if fe_server in self._down]
+        return healthy + down
+
+    def down_servers(self):
+        with self._lock:
+            return sorted(self._down)
+
+    def get(self, table):
+        """
+        return the cached be location of table, None if missing or expired
+        """
+        if not self.redirect_ttl:
+            return None
+        with self._lock:
+            cached = self._locations.get(table)
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+            self._locations.pop(table, None)
+        return None
+
+    def put(self, table, location):
+        if self.redirect_ttl:
+            with self._lock:
+                self._locations[table] = (location, time.monotonic() + self.redirect_ttl)
+
+    def invalidate(self, table=None):
+        """
+        drop the cached be location of table, or of all tables if table is None
+        """
+        with self._lock:
+            if table is None:
+                self._locations.clear()
+            else:
+                self._locations.pop(table, None)
+
+    def mark_ok(self, fe_server):
+        with self._lock:
+            self._fails[fe_server] = 0
+            if fe_server in self._down:
+                self._down.discard(fe_server)
+                log.info(f"fe {fe_server} is available again")
+
+    def mark_fail(self, fe_server):
+        with self._lock:
+            self._fails[fe_server] = self._fails.get(fe_server, 0) + 1
+            if self._fails[fe_server] < self.fail_threshold or fe_server in self._down:
+                return
+            self._down.add(fe_server)
+            log.warning(f"fe {fe_server} is marked down, will probe every {self.probe_interval} seconds")
+            if self.probe and self._prober is None:
+                self._prober = threading.Thread(target=self._probe_loop, name='DorisFeProbe', daemon=True)
+                self._prober.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            with self._lock:
+                down = list(self._down)
+                if not down:
+                    self._prober = None
+                    return
+            for fe_server in down:
+                try:
+                    if self.probe(fe_server):
+                        self.mark_ok(fe_server)
+                except Exception as e:
+                    log.debug(f"probe fe {fe_server} fail, {e}")
@@ -20,6 +20,11 @@
 
 # document >> https://github.com/TurboWay/DorisClient
 
-from .BaseSession import DorisSession, DorisLogger, Logger, Retry
+from .BaseSession import DorisSession, DorisLogger, Logger, Retry, LoadSummary, LoadResult, NoAvailableBackend
+from ._Columnar import ColumnarResult
 from .MetaSession import DorisMeta
-from .AdminSession import DorisAdmin
+from .AdminSession import DorisAdmin, BucketPolicy
+from .AsyncSession import AsyncDorisSession, AsyncRetry
+from .Writer import DorisWriter
+from .MetaCache import MetaCache
+from .Metrics import LoadMetrics, StatsdExporter
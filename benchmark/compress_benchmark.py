@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+throughput of stream load body compression versus payload size, no doris needed
+
+python benchmark/compress_benchmark.py
+python benchmark/compress_benchmark.py --format csv --rows 1000 10000 100000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DorisClient._Encoder import encode, compress, COMPRESS_TYPES
+
+
+def make_rows(n):
+    random.seed(n)
+    for i in range(n):
+        yield {
+            'id': i,
+            'shop_code': f'sdd{random.randint(1, 5000)}',
+            'sale_amount': round(random.random() * 1000, 2),
+            'sale_date': f'2024-01-{random.randint(1, 28):02d}',
+            'remark': random.choice(['', 'vip', 'refund', 'online order', None]),
+        }
+
+
+def available():
+    for compress_type in COMPRESS_TYPES:
+        try:
+            compress(b'', compress_type)
+            yield compress_type
+        except AssertionError:
+            print(f'skip {compress_type}, codec is not installed')
+
+
+def run(format, sizes, repeat):
+    codecs = list(available())
+    print(f"{'format':<8}{'rows':>10}{'raw MB':>10}{'codec':>8}{'MB':>10}{'ratio':>8}{'MB/s':>10}")
+    for rows in sizes:
+        _, body, _ = encode(list(make_rows(rows)), format=format)
+        raw = body.encode('utf-8') if isinstance(body, str) else body
+        raw_mb = len(raw) / 1024 ** 2
+        for compress_type in codecs:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                # stream the body in 1MB blocks like a chunked stream load does
+                blocks = (raw[i:i + 1024 * 1024] for i in range(0, len(raw), 1024 * 1024))
+                size = sum(len(block) for block in compress(blocks, compress_type))
+            cost = (time.perf_counter() - start) / repeat
+            print(f"{format:<8}{rows:>10}{raw_mb:>10.2f}{compress_type:>8}{size / 1024 ** 2:>10.2f}"
+                  f"{len(raw) / max(size, 1):>8.1f}{raw_mb / cost:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--format', default='json', choices=['json', 'csv'])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000, 500000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run(args.format, args.rows, args.repeat)
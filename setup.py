@@ -29,6 +29,12 @@ setup(
     packages = find_packages(),
     include_package_data = True,
     platforms = "any",
-    install_requires = ["requests", "PyMySQL"]
+    install_requires = ["requests", "PyMySQL"],
+    extras_require = {
+        "lz4": ["lz4"],
+        "zstd": ["zstandard"],
+        "async": ["aiohttp", "aiomysql"],
+        "pandas": ["numpy", "pandas"],
+    }
 )
 
@@ -0,0 +1,179 @@
+import json
+import threading
+import pytest
+from DorisClient import DorisSession
+
+
+def read_body(data):
+    """
+    bytes of a request body: str, bytes or iterable of bytes
+    """
+    if data is None:
+        return b''
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    if isinstance(data, bytes):
+        return data
+    return b''.join(data)
+
+
+class FakeResponse:
+
+    def __init__(self, status_code=200, body=None, headers=None):
+        self.status_code = status_code
+        self.text = body if isinstance(body, str) else json.dumps(body or {})
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeHttp:
+    """
+    requests.Session stand-in: fe answers a stream load with a 307 to the next be, be loads the body
+
+    `be_handler(url, headers, body)` returns the be response dict, default a successful load of every line
+    """
+
+    def __init__(self, bes=('be1:8040',), be_handler=None):
+        self.bes = list(bes)
+        self.be_handler = be_handler
+        self.calls = []
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def put(self, url, data=None, headers=None, **kwargs):
+        body = read_body(data)
+        headers = dict(headers or {})
+        with self._lock:
+            self.calls.append((url, headers, body))
+            if url.endswith('/_stream_load_2pc'):
+                return FakeResponse(200, {'status': 'Success', 'msg': headers['txn_operation']})
+            if ':8030/' in url:
+                be = self.bes[self._next % len(self.bes)]
+                self._next += 1
+                return FakeResponse(307, '', {'Location': url.replace(url.split('/')[2], be)})
+        if self.be_handler:
+            res = self.be_handler(url, headers, body)
+            if isinstance(res, FakeResponse):
+                return res
+        else:
+            res = {'Status': 'Success', 'NumberLoadedRows': body.count(b'\n') or 1, 'LoadBytes': len(body),
+                   'LoadTimeMs': 1}
+        res.setdefault('Label', headers.get('label'))
+        return FakeResponse(200, res)
+
+    def get(self, url, **kwargs):
+        return FakeResponse(200, {})
+
+    def be_calls(self):
+        return [call for call in self.calls if ':8040/' in call[0]]
+
+    def txn_calls(self):
+        return [call[1]['txn_operation'] for call in self.calls if call[0].endswith('/_stream_load_2pc')]
+
+
+@pytest.fixture
+def http():
+    return FakeHttp()
+
+
+@pytest.fixture
+def no_wait(monkeypatch):
+    monkeypatch.setattr('DorisClient.BaseSession.retry_delay', lambda *args, **kwargs: 0)
+
+
+@pytest.fixture
+def session(http, no_wait):
+    doris = DorisSession(['fe1:8030'], 'db', 'user', 'passwd')
+    doris._session = lambda: http
+    yield doris
+    doris.router.invalidate()
+
+
+class FakeCursor:
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+        self.description = None
+
+    def execute(self, sql, args=None):
+        self.conn.queries.append(sql)
+        rows = self.conn.fe.handler(sql.strip(), self.conn)
+        self.rows = list(rows or [])
+        self.description = [(k, None) for k in self.rows[0]] if self.rows else None
+        return len(self.rows)
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        ...
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class FakeConnection:
+
+    def __init__(self, fe, host):
+        self.fe = fe
+        self.host = host
+        self.db = None
+        self.queries = []
+        self.closed = False
+
+    def cursor(self, cursors=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        ...
+
+    def ping(self, reconnect=True):
+        ...
+
+    def select_db(self, db):
+        self.db = db
+
+    def close(self):
+        self.closed = True
+
+
+class FakeFe:
+    """
+    pymysql stand-in: `handler(sql, conn)` returns the rows of a query, default no rows
+    """
+
+    def __init__(self, handler=None, down=()):
+        self.handler = handler or (lambda sql, conn: [])
+        self.down = set(down)
+        self.connections = []
+        self._lock = threading.Lock()
+
+    def connect(self, host, **kwargs):
+        if host in self.down:
+            import pymysql
+            raise pymysql.err.OperationalError(2003, f"Can't connect to MySQL server on '{host}'")
+        conn = FakeConnection(self, host)
+        with self._lock:
+            self.connections.append(conn)
+        return conn
+
+
+@pytest.fixture
+def fe(monkeypatch):
+    fake = FakeFe()
+    monkeypatch.setattr('DorisClient._Pool.pymysql.connect', fake.connect)
+    return fake
@@ -0,0 +1,43 @@
+import itertools
+from DorisClient import LoadResult
+
+txn_ids = itertools.count(1)
+
+
+def precommit(url, headers, body):
+    assert headers['two_phase_commit'] == 'true'
+    return {'Status': 'Success', 'TxnId': next(txn_ids)}
+
+
+def test_every_transaction_is_committed(session, http):
+    http.be_handler = precommit
+    summary = session.streamload_2pc('tb', [{'id': i} for i in range(6)], chunk_rows=2, max_workers=2)
+    assert summary and summary['committed']
+    assert len(summary['txns']) == 3 and all(txn['txn_id'] for txn in summary['txns'])
+    assert http.txn_calls() == ['commit'] * 3
+
+
+def test_one_failed_chunk_aborts_every_transaction(session, http):
+    def be(url, headers, body):
+        if b'"id": 2' in body:
+            return {'Status': 'Fail', 'Message': '[DATA_QUALITY_ERROR]too many filtered rows'}
+        return precommit(url, headers, body)
+
+    http.be_handler = be
+    summary = session.streamload_2pc('tb', [{'id': i} for i in range(6)], chunk_rows=2, max_workers=1)
+    assert not summary and not summary['committed']
+    assert summary['failed_chunks'] == 1
+    assert set(http.txn_calls()) == {'abort'} and len(http.txn_calls()) == len(summary['txns'])
+
+
+def test_precommitted_label_counts_only_for_two_phase_commit():
+    res = LoadResult(Status='Label Already Exists', ExistingJobStatus='PRECOMMITTED')
+    assert not res
+    res.two_phase_commit = True
+    assert res
+
+
+def test_retry_of_a_plain_load_does_not_accept_a_precommitted_label(session, http):
+    http.be_handler = lambda url, headers, body: {'Status': 'Label Already Exists',
+                                                  'ExistingJobStatus': 'PRECOMMITTED'}
+    assert not session.streamload('tb', [{'id': 1}])
@@ -0,0 +1,188 @@
+import threading
+import pytest
+from types import SimpleNamespace
+from DorisClient import DorisAdmin
+
+
+def finishes(fn, seconds=5):
+    """
+    run fn in a thread, return its result, fail instead of hanging the suite
+    """
+    box = {}
+    thread = threading.Thread(target=lambda: box.update(result=fn()), daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), 'hangs'
+    return box.get('result')
+
+
+def test_modify_many_caps_jobs_below_the_pool(fe):
+    da = DorisAdmin(['fe1:8030'], 'db', 'user', 'passwd', mysql_pool_size=3)
+    lock, running = threading.Lock(), {'now': 0, 'max': 0}
+
+    def modify(**kwargs):
+        with da.pin():
+            with lock:
+                running['now'] += 1
+                running['max'] = max(running['max'], running['now'])
+            threading.Event().wait(0.02)
+            with lock:
+                running['now'] -= 1
+        return True
+
+    da.modify = modify
+    targets = [{'database_name': 'db', 'table_name': f"t{i}", 'size': 1} for i in range(6)]
+    results = finishes(lambda: da.modify_many(targets, max_jobs=8))
+    assert [r['status'] for r in results] == ['changed'] * 6
+    assert running['max'] == 2
+
+
+def test_modify_many_finishes_when_the_state_cannot_be_saved(fe, tmp_path):
+    da = DorisAdmin(['fe1:8030'], 'db', 'user', 'passwd')
+    da.modify = lambda **kwargs: True
+    targets = [{'database_name': 'db', 'table_name': f"t{i}", 'size': 1} for i in range(3)]
+    results = finishes(lambda: da.modify_many(targets, max_jobs=1, state_file=str(tmp_path / 'missing' / 'state.json')))
+    assert [r['status'] for r in results] == ['failed'] * 3
+
+
+def copy_handler(copied):
+    def handler(sql, conn):
+        if sql.startswith('insert into'):
+            copied.append(sql)
+            return [{}] * 3
+        if sql.startswith('select count(1)'):
+            return [{'ct': 3}]
+        return []
+    return handler
+
+
+def test_copy_chunks_resumes_from_the_checkpoint(fe, tmp_path):
+    copied = []
+    fe.handler = copy_handler(copied)
+    (tmp_path / 'db.tb.json').write_text('{"label": "run1", "chunks": {"p1": {"rows": 3, "elapsed": 1}}}')
+    da = DorisAdmin(['fe1:8030'], 'db', 'user', 'passwd')
+    checkpoint = da._checkpoint('db', 'tb', str(tmp_path))
+    assert checkpoint['resumed'] and checkpoint['label'] == 'run1'
+    table = SimpleNamespace(partitions={'p1': '', 'p2': '', 'p3': ''})
+    da._copy_chunks('tb', 'db', 'tb', table, 'id', 'id', checkpoint)
+    assert len(copied) == 2 and all('modify_run1_' in sql for sql in copied)
+    assert set(da._checkpoint('db', 'tb', str(tmp_path))['chunks']) == {'p1', 'p2', 'p3'}
+
+
+def test_copy_chunks_on_a_full_pool_runs_on_the_pinned_connection(fe):
+    copied = []
+    fe.handler = copy_handler(copied)
+    da = DorisAdmin(['fe1:8030'], 'db', 'user', 'passwd', mysql_pool_size=1)
+    table = SimpleNamespace(partitions={'p1': '', 'p2': ''})
+    checkpoint = da._checkpoint('db', 'tb')
+
+    def copy():
+        with da.pin():
+            da._copy_chunks('tb', 'db', 'tb', table, 'id', 'id', checkpoint, copy_workers=4)
+
+    finishes(copy)
+    assert len(copied) == 2 and len(fe.connections) == 1
+
+
+def test_chunked_modify_saves_the_checkpoint_before_creating_the_table(fe, tmp_path):
+    path = tmp_path / 'db.tb.json'
+
+    def handler(sql, conn):
+        if sql.startswith('show create table'):
+            return [{'Create Table': "CREATE TABLE `tb` (\n  `id` int NULL\n) ENGINE=OLAP\nDUPLICATE KEY(`id`)\n"
+                                     "DISTRIBUTED BY HASH(`id`) BUCKETS 1\nPROPERTIES (\n\"replication_num\" = \"1\"\n);"}]
+        if sql.startswith('CREATE TABLE'):
+            assert path.exists()
+            raise Exception('crash')
+        return []
+
+    fe.handler = handler
+    da = DorisAdmin(['fe1:8030'], 'db', 'user', 'passwd')
+    with pytest.raises(Exception, match='crash'):
+        da.modify(database_name='db', table_name='tb', buckets=2, chunked=True, checkpoint_dir=str(tmp_path))
+    assert da._checkpoint('db', 'tb', str(tmp_path))['resumed']
+
+
+def count_handler(queries, tmp_rows=3):
+    def handler(sql, conn):
+        if sql.startswith('select count(1)'):
+            queries.append(sql)
+            threading.Event().wait(0.01)
+            return [{'ct': tmp_rows if '_tmp' in sql else 3, 'fp': 7}]
+        if sql.startswith('show partitions'):
+            return [{'PartitionName': f"p{i}", 'PartitionKey': 'dt'} for i in range(4)]
+        return []
+    return handler
+
+
+@pytest.mark.parametrize('pool_size', [1, 2])
+def test_check_inside_modify_does_not_wait_on_the_pool(fe, pool_size):
+    queries = []
+    fe.handler = count_handler(queries)
+    da = DorisAdmin(['fe1:8030'], 'db', 'user', 'passwd', mysql_pool_size=pool_size)
+
+    def check():
+        with da.pin():
+            return da.check('tb', 'tb', database_name='db', workers=4)
+
+    assert len(finishes(check)) == 4
+    assert len(queries) == 8 and len(fe.connections) <= pool_size
+
+
+def test_check_fingerprint_tells_null_from_empty(fe):
+    queries = []
+    fe.handler = count_handler(queries)
+    da = DorisAdmin(['fe1:8030'], 'db', 'user', 'passwd')
+    da.check('tb', 'tb', database_name='db', fingerprint=['id', 'name'])
+    assert "ifnull(cast(`name` as string), '\\\\N')" in queries[0]
+
+
+def test_check_stops_on_the_first_mismatch(fe):
+    queries = []
+    fe.handler = count_handler(queries, tmp_rows=2)
+    da = DorisAdmin(['fe1:8030'], 'db', 'user', 'passwd', mysql_pool_size=1)
+    with pytest.raises(Exception, match='1 partitions differ'):
+        da.check('tb', 'tb', database_name='db')
+    assert len(queries) < 8
+
+
+GB = 1024 ** 3
+
+
+def partition_size(database_name, table_name, partition_name, partition_key, distribution_key, buckets, size,
+                   std_size=0):
+    return {'database_name': database_name, 'table_name': table_name, 'partition_name': partition_name,
+            'partition_key': partition_key, 'distribution_key': distribution_key, 'buckets': buckets,
+            'tablets': buckets, 'size': size, 'max_size': size / buckets, 'std_size': std_size}
+
+
+def advisor(fe):
+    rows = [
+        partition_size('db', 'big', 'p1', 'dt', 'id', 4, 100 * GB),  # far too few buckets
+        partition_size('db', 'fine', 'p1', 'dt', 'id', 4, 2 * GB),  # 5 recommended, within tolerance
+        partition_size('db', 'skewed', 'p1', 'dt', 'id', 4, 2 * GB, std_size=0.4 * GB),  # std / mean 0.8
+        partition_size('db', 'random', 'p1', 'dt', 'RANDOM', 4, 2 * GB, std_size=0.4 * GB),  # no key skew
+        partition_size('db', 'plain', 'plain', '', 'id', 64, 1 * GB),  # too many buckets, not partitioned
+        partition_size('db', 'tiny', 'p1', 'dt', 'id', 64, 1024),
+    ]
+    fe.handler = lambda sql, conn: rows if 'meta_partition' in sql else []
+    return DorisAdmin(['fe1:8030'], 'db', 'user', 'passwd')
+
+
+def test_advise_plans_partitions_off_the_policy_worst_first(fe):
+    from DorisClient import BucketPolicy
+    plan = advisor(fe).advise(BucketPolicy(max_key_skew=0.5, min_bytes=GB))
+    assert [(t['table_name'], t['reason']) for t in plan] == [
+        ('big', 'buckets'), ('plain', 'buckets'), ('skewed', 'key_skew')]
+    big = plan[0]
+    assert big['partition_name'] == 'p1' and big['buckets'] == 205 and big['current_buckets'] == 4
+    assert 'partition_name' not in plan[1]  # a not partitioned table is rebuilt as a whole
+    assert plan[2]['key_skew'] == 0.8
+
+
+def test_select_targets_keeps_modify_kwargs_biggest_first(fe):
+    targets = advisor(fe).select_targets(min_bytes=GB)
+    assert targets == [
+        {'database_name': 'db', 'table_name': 'big', 'partition_name': 'p1', 'buckets': 205, 'size': 100 * GB},
+        {'database_name': 'db', 'table_name': 'plain', 'buckets': 3, 'size': GB},
+    ]
@@ -0,0 +1,154 @@
+import json
+import asyncio
+import threading
+import pytest
+from conftest import read_body
+
+pytest.importorskip('aiohttp')
+pytest.importorskip('aiomysql')
+from DorisClient import AsyncDorisSession
+
+
+class FakeAioResponse:
+
+    def __init__(self, status, body='', headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    async def text(self):
+        return self.body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeAioHttp:
+    """
+    aiohttp.ClientSession stand-in: fe redirects to be, be loads the body
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.closed = False
+
+    def put(self, url, data=None, headers=None, **kwargs):
+        return _Put(self, url, data, headers)
+
+    async def close(self):
+        self.closed = True
+
+
+class _Put:
+
+    def __init__(self, http, url, data, headers):
+        self.http, self.url, self.data, self.headers = http, url, data, headers
+
+    async def __aenter__(self):
+        if ':8030/' in self.url:
+            return FakeAioResponse(307, headers={'Location': self.url.replace(self.url.split('/')[2], 'be1:8040')})
+        if hasattr(self.data, '__aiter__'):
+            body = b''.join([block async for block in self.data])
+        else:
+            body = read_body(self.data)
+        self.http.calls.append((self.url, self.headers, body))
+        return FakeAioResponse(200, json.dumps({'Status': 'Success', 'Label': self.headers['label'],
+                                                'NumberLoadedRows': body.count(b'\n') or 1}))
+
+    async def __aexit__(self, *args):
+        return False
+
+
+def session(http):
+    doris = AsyncDorisSession(['fe1:8030', 'fe2:8030'], 'db', 'user', 'passwd')
+    doris._semaphore = asyncio.Semaphore(10)
+    doris._async_session = lambda: http
+    return doris
+
+
+def test_encoding_runs_off_the_event_loop():
+    http = FakeAioHttp()
+
+    async def main():
+        doris = session(http)
+        loop_thread = threading.get_ident()
+        threads = []
+        prepare = doris._prepare
+
+        def spy(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return prepare(*args, **kwargs)
+
+        doris._prepare = spy
+        assert await doris.streamload('tb', [{'id': 1}])
+        assert await doris.streamload('tb', iter([{'id': 2}, {'id': 3}]))
+        return loop_thread, threads
+
+    loop_thread, threads = asyncio.run(main())
+    assert threads and loop_thread not in threads
+    assert http.calls[1][2] == b'{"id": 2}\n{"id": 3}\n'
+
+
+def test_sql_pools_span_every_fe(monkeypatch):
+    created = []
+
+    class FakePool:
+        def __init__(self, host):
+            self.host, self.size, self.freesize = host, 2, 2 if host == 'fe2' else 0
+
+    async def create_pool(**cfg):
+        created.append(cfg['host'])
+        return FakePool(cfg['host'])
+
+    monkeypatch.setattr('DorisClient.AsyncSession.aiomysql.create_pool', create_pool)
+
+    async def main():
+        doris = session(FakeAioHttp())
+        return await doris._aio_pool()
+
+    assert asyncio.run(main()).host == 'fe2'
+    assert created == ['fe1', 'fe2']
+
+
+def test_async_streamload_2pc_commits_every_chunk():
+    http = FakeAioHttp()
+    operations = []
+    put = http.put
+
+    def put_2pc(url, data=None, headers=None, **kwargs):
+        if url.endswith('/_stream_load_2pc'):
+            operations.append(headers['txn_operation'])
+            return FakeAioResponse(200, json.dumps({'status': 'Success'}))
+        return put(url, data, headers, **kwargs)
+
+    http.put = put_2pc
+
+    async def main():
+        doris = session(http)
+        return await doris.streamload_2pc('tb', [{'id': i} for i in range(4)], chunk_rows=2)
+
+    summary = asyncio.run(main())
+    assert summary and summary['committed'] and len(summary['txns']) == 2
+    assert operations == ['commit', 'commit']
+    assert all(call[1]['two_phase_commit'] == 'true' for call in http.calls)
+
+
+def test_chunks_are_read_off_the_event_loop():
+    http = FakeAioHttp()
+    threads = []
+
+    def rows():
+        for i in range(5):
+            threads.append(threading.get_ident())
+            yield {'id': i}
+
+    async def main():
+        doris = session(http)
+        return threading.get_ident(), await doris.streamload('tb', rows(), chunk_rows=2)
+
+    loop_thread, summary = asyncio.run(main())
+    assert summary and summary['chunks'] == 3 and summary['rows'] == 5
+    assert threads and loop_thread not in threads
@@ -0,0 +1,94 @@
+from DorisClient._Ddl import parse_ddl, replace_distribution, remove_properties
+
+RANGE_DDL = """CREATE TABLE `sales` (
+  `dt` date NOT NULL,
+  `id` int(11) NULL,
+  `amount` decimal(10, 2) NULL
+) ENGINE=OLAP
+DUPLICATE KEY(`dt`, `id`)
+COMMENT 'OLAP'
+PARTITION BY RANGE(`dt`)
+(PARTITION p20240101 VALUES [('2024-01-01'), ('2024-01-02')),
+PARTITION p20240102 VALUES [('2024-01-02'), ('2024-01-03')))
+DISTRIBUTED BY HASH(`id`) BUCKETS 8
+PROPERTIES (
+"replication_allocation" = "tag.location.default: 3",
+"in_memory" = "false",
+"dynamic_partition.enable" = "true",
+"dynamic_partition.buckets" = "8",
+"storage_format" = "V2"
+);"""
+
+LIST_DDL = """CREATE TABLE `users` (
+  `city` varchar(20) NOT NULL,
+  `id` bigint(20) NOT NULL,
+  `name` varchar(50) NULL
+) ENGINE=OLAP
+UNIQUE KEY(`city`, `id`)
+COMMENT 'OLAP'
+PARTITION BY LIST(`city`)
+(PARTITION p_bj VALUES IN ("beijing"),
+PARTITION p_sh VALUES IN ("shanghai", "hangzhou"))
+DISTRIBUTED BY HASH(`city`, `id`) BUCKETS AUTO
+PROPERTIES (
+"replication_num" = "1",
+"enable_unique_key_merge_on_write" = "true"
+);"""
+
+PLAIN_DDL = """CREATE TABLE `events` (
+  `id` bigint(20) NULL,
+  `payload` text NULL
+) ENGINE=OLAP
+DUPLICATE KEY(`id`)
+COMMENT 'OLAP'
+DISTRIBUTED BY RANDOM BUCKETS 4
+PROPERTIES (
+"replication_allocation" = "tag.location.default: 1",
+"in_memory" = "false"
+);"""
+
+
+def test_range_partitioned_ddl():
+    table = parse_ddl(RANGE_DDL)
+    assert (table.engine, table.model, table.keys) == ('OLAP', 'DUPLICATE', ['dt', 'id'])
+    assert (table.distribution_type, table.distribution_key, table.buckets) == ('HASH', ['id'], 8)
+    assert (table.partition_type, table.partition_columns) == ('RANGE', ['dt'])
+    assert table.partitions == {'p20240101': "VALUES [('2024-01-01'), ('2024-01-02'))",
+                                'p20240102': "VALUES [('2024-01-02'), ('2024-01-03'))"}
+    assert table.replication_num == 3 and table.properties['storage_format'] == 'V2'
+
+
+def test_list_partitioned_ddl_with_auto_buckets():
+    table = parse_ddl(LIST_DDL)
+    assert (table.model, table.keys) == ('UNIQUE', ['city', 'id'])
+    assert table.distribution == 'HASH(`city`, `id`)' and table.buckets is None
+    assert table.partition_type == 'LIST'
+    assert table.partitions == {'p_bj': 'VALUES IN ("beijing")', 'p_sh': 'VALUES IN ("shanghai", "hangzhou")'}
+    assert table.replication_num == 1 and table.meta()['bucket_num'] == 0
+
+
+def test_unpartitioned_random_ddl():
+    table = parse_ddl(PLAIN_DDL)
+    assert table.partition_type is None and table.partitions == {}
+    assert (table.distribution_type, table.distribution_key, table.distribution) == ('RANDOM', [], 'RANDOM')
+    assert table.buckets == 4
+
+
+def test_replace_distribution_also_changes_dynamic_partition_buckets():
+    ddl = replace_distribution(RANGE_DDL, 'HASH(`dt`, `id`)', 16)
+    table = parse_ddl(ddl)
+    assert table.distribution_key == ['dt', 'id'] and table.buckets == 16
+    assert table.properties['dynamic_partition.buckets'] == '16'
+    assert table.partitions == parse_ddl(RANGE_DDL).partitions
+    assert parse_ddl(replace_distribution(PLAIN_DDL, 'RANDOM', 2)).buckets == 2
+
+
+def test_remove_properties_keeps_a_valid_properties_clause():
+    ddl = remove_properties(RANGE_DDL, ['in_memory', ' storage_format'])
+    table = parse_ddl(ddl)
+    assert 'in_memory' not in table.properties and 'storage_format' not in table.properties
+    assert table.properties['dynamic_partition.buckets'] == '8'
+    assert ddl.endswith('"dynamic_partition.buckets" = "8"\n);')
+    ddl = remove_properties(LIST_DDL, ['enable_unique_key_merge_on_write'])
+    assert ddl.endswith('"replication_num" = "1"\n);')
+    assert parse_ddl(ddl).properties == {'replication_num': '1'}
@@ -0,0 +1,71 @@
+import io
+import json
+import gzip
+from DorisClient._Encoder import chunks, encode, compress, header_value
+
+
+def test_list_json_body():
+    columns, body, headers = encode([{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}])
+    assert columns == ['id', 'name']
+    assert json.loads(body) == [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}]
+    assert headers['strip_outer_array'] == 'true'
+    assert encode([])[0] is None
+
+
+def test_stream_json_lines():
+    columns, body, headers = encode(iter([{'id': 1}, {'id': 2}]))
+    assert columns == ['id']
+    assert b''.join(body) == b'{"id": 1}\n{"id": 2}\n'
+    assert headers['read_json_by_line'] == 'true'
+
+
+def test_csv_null_enclose_and_header():
+    columns, body, headers = encode([{'id': 1, 'name': 'a\tb'}, {'id': 2, 'name': None}], format='csv_with_names')
+    assert columns == ['id', 'name']
+    assert body.decode().split('\n')[:3] == ['id\tname', '1\t"a\tb"', '2\t\\N']
+    assert headers['column_separator'] == header_value('\t')
+
+
+def test_chunks_by_rows_and_bytes():
+    rows = [{'id': i, 'name': 'x' * 10} for i in range(100)]
+    assert [len(chunk) for chunk in chunks(rows, chunk_rows=30)] == [30, 30, 30, 10]
+    by_bytes = list(chunks(rows, chunk_bytes=len(json.dumps(rows[0])) * 20))
+    assert sum(len(chunk) for chunk in by_bytes) == 100 and len(by_bytes) > 1
+
+
+def test_file_like_json_is_split_on_lines_and_sent_as_is():
+    f = io.StringIO(''.join(json.dumps({'id': i}) + '\n' for i in range(5)))
+    parts = list(chunks(f, chunk_rows=2))
+    assert [len(part) for part in parts] == [2, 2, 1]
+    columns, body, headers = encode(parts[0])
+    assert columns == ['id']
+    assert body == b'{"id": 0}\n{"id": 1}\n'
+    assert headers['read_json_by_line'] == 'true'
+
+
+def test_file_like_csv_with_names_repeats_the_header():
+    f = io.BytesIO(b'id,name\n1,a\n2,b\n3,c\n')
+    parts = list(chunks(f, chunk_rows=2, header=True))
+    assert parts == [[b'id,name\n', b'1,a\n', b'2,b\n'], [b'id,name\n', b'3,c\n']]
+    columns, body, _ = encode(parts[1], format='csv_with_names', column_separator=',')
+    assert body == b'id,name\n3,c\n'
+
+
+def test_chunked_file_like_load(session, http):
+    f = io.StringIO(''.join(json.dumps({'id': i}) + '\n' for i in range(5)))
+    summary = session.streamload('tb', f, chunk_rows=2)
+    assert summary and summary['rows'] == 5 and summary['chunks'] == 3
+    bodies = sorted(call[2] for call in http.be_calls())
+    assert bodies[0] == b'{"id": 0}\n{"id": 1}\n'
+
+
+def test_blank_lines_of_a_file_like_source_are_dropped(session, http):
+    f = io.StringIO('{"a":1}\n{"a":2}\n\n\n')
+    assert list(chunks(f, chunk_rows=2)) == [['{"a":1}\n', '{"a":2}\n']]
+    summary = session.streamload('tb', io.StringIO('{"a":1}\n{"a":2}\n\n'), chunk_rows=2)
+    assert summary and summary['chunks'] == 1 and summary['failed_chunks'] == 0
+
+
+def test_gzip_compress():
+    body = compress(b'{"id": 1}\n', 'gz')
+    assert gzip.decompress(b''.join(body) if not isinstance(body, bytes) else body) == b'{"id": 1}\n'
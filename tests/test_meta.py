@@ -0,0 +1,172 @@
+import json
+from DorisClient import DorisMeta
+
+
+def test_collector_workers_default_to_the_pool_capacity(fe):
+    dm = DorisMeta(['fe1:8030', 'fe2:8030'], 'db', 'user', 'passwd', mysql_pool_size=2)
+    assert dm._workers() == 4
+    assert dm._workers(3) == 3
+    assert dm._workers(16) == 4
+
+
+def test_collect_does_not_wait_on_the_pool(fe, http):
+    rows = [{'database_name': 'db', 'table_name': f"t{i}", 'partitions_sql': f"show partitions from db.t{i}"}
+            for i in range(6)]
+
+    def handler(sql, conn):
+        if sql.startswith('show partitions'):
+            return [{'PartitionId': 1, 'VisibleVersion': 2, 'VisibleVersionTime': '2024-01-01 00:00:00'}]
+        if 'partitions_sql' in sql:
+            return rows
+        return []
+
+    fe.handler = handler
+    dm = DorisMeta(['fe1:8030'], 'db', 'user', 'passwd', mysql_pool_size=1)
+    dm._session = lambda: http
+    dm._pool().acquire_timeout = 1
+    dm.collect_partition(workers=8)
+    assert dm.pool.stats()['fe1']['busy'] == 0
+    assert len(http.be_calls()) == 1
+
+
+def meta(fe, http, handler):
+    fe.handler = handler
+    dm = DorisMeta(['fe1:8030'], 'db', 'user', 'passwd')
+    dm._session = lambda: http
+    return dm
+
+
+def queries(fe):
+    return [sql for conn in fe.connections for sql in conn.queries]
+
+
+def loaded(http):
+    rows = []
+    for _, _, body in http.be_calls():
+        rows += json.loads(body) if body.startswith(b'[') else [json.loads(line) for line in body.splitlines()]
+    return rows
+
+
+def test_partition_delta_replaces_changed_keeps_unchanged_and_deletes_dropped(fe, http):
+    def handler(sql, conn):
+        if sql.startswith('select database_name, table_name, PartitionId, VisibleVersion'):
+            return [{'database_name': 'db', 'table_name': 't1', 'PartitionId': 1, 'VisibleVersion': 2,
+                     'VisibleVersionTime': '2024-01-01 00:00:00'},
+                    {'database_name': 'db', 'table_name': 't1', 'PartitionId': 2, 'VisibleVersion': 3,
+                     'VisibleVersionTime': '2024-01-01 00:00:00'},
+                    {'database_name': 'db', 'table_name': 't1', 'PartitionId': 9, 'VisibleVersion': 1,
+                     'VisibleVersionTime': '2024-01-01 00:00:00'},
+                    {'database_name': 'db', 'table_name': 'gone', 'PartitionId': 5, 'VisibleVersion': 1,
+                     'VisibleVersionTime': '2024-01-01 00:00:00'}]
+        if 'partitions_sql' in sql:
+            return [{'database_name': 'db', 'table_name': 't1', 'partitions_sql': 'show partitions from db.t1'}]
+        if sql.startswith('show partitions'):
+            return [{'PartitionId': 1, 'VisibleVersion': 2, 'VisibleVersionTime': '2024-01-01 00:00:00'},
+                    {'PartitionId': 2, 'VisibleVersion': 4, 'VisibleVersionTime': '2024-01-02 00:00:00'},
+                    {'PartitionId': 3, 'VisibleVersion': 1, 'VisibleVersionTime': '2024-01-02 00:00:00'}]
+        return []
+
+    dm = meta(fe, http, handler)
+    dm.collect_partition(incremental=True)
+    deletes = [sql for sql in queries(fe) if sql.startswith('delete')]
+    assert "delete from meta_partition where database_name='db' and table_name='t1' and PartitionId in (2,9)" in deletes
+    assert "delete from meta_partition where database_name='db' and table_name='gone'" in deletes
+    assert not any(sql.startswith('truncate') for sql in queries(fe))
+    assert sorted(row['PartitionId'] for row in loaded(http)) == [2, 3]
+
+
+def test_tablet_delta_recollects_changed_partitions_and_deletes_dropped_ones(fe, http):
+    def handler(sql, conn):
+        if 'tablets_sql' in sql:
+            return [{'database_name': 'db', 'table_name': 't1', 'PartitionId': 2, 'PartitionName': 'p2',
+                     'tablets_sql': 'show tablets from `db`.`t1` partition `p2`'}]
+        if sql.startswith('select distinct database_name, table_name, PartitionId from meta_tablet'):
+            return [{'database_name': 'db', 'table_name': 't1', 'PartitionId': p} for p in (1, 2, 7)]
+        if sql.startswith('select database_name, table_name, PartitionId from meta_partition'):
+            return [{'database_name': 'db', 'table_name': 't1', 'PartitionId': p} for p in (1, 2)]
+        if sql.startswith('show tablets'):
+            return [{'TabletId': 20, 'Version': 5}]
+        return []
+
+    dm = meta(fe, http, handler)
+    dm.collect_tablet(incremental=True)
+    deletes = [sql for sql in queries(fe) if sql.startswith('delete')]
+    assert deletes == ["delete from meta_tablet where database_name='db' and table_name='t1' and PartitionId in (2,7)"]
+    assert [(row['PartitionId'], row['TabletId']) for row in loaded(http)] == [(2, 20)]
+
+
+def test_table_count_delta_counts_loaded_tables_and_deletes_dropped_ones(fe, http):
+    def handler(sql, conn):
+        if 'from information_schema.tables' in sql and 'cross join' not in sql:
+            return [{'table_schema': 'db', 'table_name': t} for t in ('loaded', 'idle', 'new')]
+        if sql.startswith('select database_name, table_name, max(update_time)'):
+            return [{'database_name': 'db', 'table_name': t, 'update_time': '2024-01-02 00:00:00'}
+                    for t in ('loaded', 'idle', 'gone')]
+        if sql.startswith('select database_name, table_name, max(VisibleVersionTime)'):
+            return [{'database_name': 'db', 'table_name': 'loaded', 'VisibleVersionTime': '2024-01-03 00:00:00'},
+                    {'database_name': 'db', 'table_name': 'idle', 'VisibleVersionTime': '2024-01-01 00:00:00'}]
+        if 'cross join' in sql:
+            table = sql.split("a.table_name = '")[1].split("'")[0]
+            return [{'database_name': 'db', 'table_name': table, 'table_rows': 1, 'real_table_rows': 1,
+                     'update_time': '2024-01-04 00:00:00'}]
+        return []
+
+    dm = meta(fe, http, handler)
+    dm.collect_table_count(incremental=True)
+    deletes = [sql for sql in queries(fe) if sql.startswith('delete')]
+    assert "delete from meta_table_count where database_name='db' and table_name in ('gone')" in deletes
+    assert "delete from meta_table_count where database_name='db' and table_name in ('loaded','new')" in deletes
+    assert sorted(row['table_name'] for row in loaded(http)) == ['loaded', 'new']
+
+
+def test_bulk_collect_table_sends_no_statement_per_table(fe, http):
+    def handler(sql, conn):
+        if 'table_options' in sql:
+            return [{'TABLE_SCHEMA': 'db', 'TABLE_NAME': f"t{i}", 'TABLE_MODEL': 'DUP', 'BUCKETS_NUM': 8}
+                    for i in range(3)]
+        if 'partitions_sql' in sql:
+            return [{'database_name': 'db', 'table_name': f"t{i}", 'table_type': 'BASE TABLE',
+                     'ddl_sql': f"show create table db.t{i}", 'partitions_sql': '', 'tablets_sql': ''}
+                    for i in range(3)]
+        return []
+
+    dm = meta(fe, http, handler)
+    dm.collect_table(bulk=True)
+    assert not any(sql.startswith('show create table') for sql in queries(fe))
+    assert [row['ddl'] for row in loaded(http)] == [None, None, None]
+
+
+def test_indexed_tables_skip_system_databases_of_old_clusters(fe, http):
+    def handler(sql, conn):
+        if sql == "show proc '/dbs'":
+            return [{'DbId': 1, 'DbName': 'default_cluster:information_schema'},
+                    {'DbId': 2, 'DbName': 'default_cluster:db'}]
+        if sql.startswith("show proc '/dbs/"):
+            return [{'TableName': 't1', 'IndexNum': 2}, {'TableName': 't2', 'IndexNum': 1}]
+        return []
+
+    dm = meta(fe, http, handler)
+    assert dm._indexed_tables() == {('db', 't1')}
+    assert "show proc '/dbs/1'" not in queries(fe)
+
+
+def test_collect_size_loads_while_showing_data_on_a_single_connection(fe, http):
+    import threading
+
+    def handler(sql, conn):
+        if 'information_schema.schemata' in sql:
+            return [{'schema_name': f"db{i}"} for i in range(4)]
+        if sql == 'show data':
+            return [{'TableName': 't1', 'Size': '1.000 KB', 'ReplicaCount': 1},
+                    {'TableName': 'Total', 'Size': '1.000 KB', 'ReplicaCount': 1}]
+        return []
+
+    dm = meta(fe, http, handler)
+    dm.pool_cfg['max_per_host'] = 1
+    dm.flush_bytes, dm.queue_size = 1, 1  # a load per database, while the next ones are shown
+    thread = threading.Thread(target=dm.collect_size, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive(), 'hangs'
+    assert sorted(row['database_name'] for row in loaded(http)) == ['db0', 'db1', 'db2', 'db3']
+    assert len(fe.connections) == 1 and fe.connections[0].db == 'db'
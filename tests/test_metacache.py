@@ -0,0 +1,48 @@
+import datetime
+import decimal
+import pytest
+from DorisClient import MetaCache, DorisAdmin
+
+
+def test_a_hit_returns_the_types_of_a_miss(fe):
+    cache = MetaCache()
+    doris = DorisAdmin(['fe1:8030'], 'db', 'user', 'passwd', meta_cache=cache)
+    value = [{'update_time': datetime.datetime(2024, 1, 2, 3, 4, 5), 'day': datetime.date(2024, 1, 2),
+              'size': decimal.Decimal('1.50'), 'key': ('db', 'tb'), 'raw': b'\x00\x01', 'n': 1, 'name': 'x'}]
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return value
+
+    miss = cache.fetch(doris, 'k', loader, 'db', 'tb')
+    hit = cache.fetch(doris, 'k', loader, 'db', 'tb')
+    assert len(calls) == 1 and cache.stats['hits'] == 1
+    assert hit == miss and [type(v) for v in hit[0].values()] == [type(v) for v in miss[0].values()]
+
+
+def test_modify_reads_the_ddl_and_columns_it_rebuilds_from_live(fe):
+    ddl = "CREATE TABLE `tb` (\n  `id` int NULL\n) ENGINE=OLAP\nDUPLICATE KEY(`id`)\n" \
+          "DISTRIBUTED BY HASH(`id`) BUCKETS 1\nPROPERTIES (\n\"replication_num\" = \"1\"\n);"
+    reads = []
+
+    def handler(sql, conn):
+        if sql.startswith('show create table'):
+            reads.append(sql)
+            return [{'Create Table': ddl}]
+        if 'information_schema.columns' in sql:
+            reads.append(sql)
+            return [{'column_str': 'id'}]
+        if sql.startswith('CREATE TABLE'):
+            raise Exception('stop')
+        return []
+
+    fe.handler = handler
+    cache = MetaCache(version_interval=3600)
+    da = DorisAdmin(['fe1:8030'], 'db', 'user', 'passwd', meta_cache=cache)
+    with pytest.raises(Exception, match='stop'):
+        da.modify(database_name='db', table_name='tb', buckets=2)
+    da.get_columns('db', 'tb', None)
+    da.get_columns('db', 'tb', None)
+    assert len(reads) == 3
+    assert cache._db.execute("select count(1) from meta_cache").fetchone()[0] == 0
@@ -0,0 +1,63 @@
+import socket
+from DorisClient import LoadMetrics, StatsdExporter, LoadResult
+from DorisClient.Metrics import Histogram
+
+
+def result(status='Success', **fields):
+    res = LoadResult(Status=status, **fields)
+    res.client.update(serialize_ms=2.0, upload_ms=40.0, elapsed_ms=60.0, retries=1)
+    return res
+
+
+def test_histogram_buckets_are_cumulative_with_inf():
+    h = Histogram((10, 100))
+    for value in (5, 10, 50, 1000):
+        h.observe(value)
+    assert h.cumulative() == [(10, 2), (100, 3), (float('inf'), 4)]
+    assert (h.count, h.sum) == (4, 1065)
+
+
+def test_prometheus_text_format():
+    metrics = LoadMetrics(buckets=(10, 100))
+    metrics.record('tb', result(NumberLoadedRows=3, LoadBytes=30, LoadTimeMs=50))
+    metrics.record('tb', result('Fail', Message='be busy'))
+    metrics.record('tb', error=ConnectionError('down'), client={'retries': 3, 'elapsed_ms': 500.0})
+    text = metrics.prometheus()
+    lines = text.splitlines()
+    assert text.endswith('\n')
+    assert '# TYPE doris_streamload_loads_total counter' in lines
+    for status, count in (('success', 1), ('failed', 1), ('error', 1)):
+        assert f'doris_streamload_loads_total{{table="tb",status="{status}"}} {count}' in lines
+    assert 'doris_streamload_retries_total{table="tb"} 5' in lines
+    assert 'doris_streamload_rows_loaded_total{table="tb"} 3' in lines
+    assert '# TYPE doris_streamload_server_milliseconds histogram' in lines
+    assert 'doris_streamload_server_milliseconds_bucket{table="tb",stage="LoadTimeMs",le="10"} 0' in lines
+    assert 'doris_streamload_server_milliseconds_bucket{table="tb",stage="LoadTimeMs",le="100"} 1' in lines
+    assert 'doris_streamload_server_milliseconds_bucket{table="tb",stage="LoadTimeMs",le="+Inf"} 1' in lines
+    assert 'doris_streamload_client_milliseconds_count{table="tb",stage="elapsed_ms"} 3' in lines
+    assert 'doris_streamload_client_milliseconds_sum{table="tb",stage="elapsed_ms"} 620.000' in lines
+    assert not any('stage="redirect_ms"' in line for line in lines)  # no empty histograms
+
+
+def test_session_loads_feed_the_metrics(session, http):
+    session.metrics = LoadMetrics()
+    session.streamload('tb', [{'id': 1}, {'id': 2}])
+    loads = session.metrics.snapshot()['tb']['loads']
+    assert loads == {'success': 1, 'failed': 0, 'error': 0}
+
+
+def test_statsd_lines_and_udp_send():
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(('127.0.0.1', 0))
+    server.settimeout(5)
+    exporter = StatsdExporter('127.0.0.1', server.getsockname()[1], prefix='doris')
+    try:
+        lines = exporter.lines('tb', result(NumberLoadedRows=3, LoadBytes=30, LoadTimeMs=50))
+        assert lines[:3] == ['doris.tb.loads.success:1|c', 'doris.tb.rows_loaded:3|c', 'doris.tb.bytes:30|c']
+        assert 'doris.tb.server.LoadTimeMs:50|ms' in lines and 'doris.tb.retries:1|c' in lines
+        assert exporter.lines('tb', error=ConnectionError('down')) == ['doris.tb.loads.error:1|c']
+        exporter('tb', result('Fail'))
+        assert server.recv(4096).decode().split('\n')[0] == 'doris.tb.loads.failed:1|c'
+    finally:
+        exporter.close()
+        server.close()
@@ -0,0 +1,41 @@
+import pytest
+from DorisClient._Pipeline import Pipeline
+
+
+class FakeSession:
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.loads = []
+        self.executed = []
+
+    def execute(self, sql):
+        self.executed.append(sql)
+
+    def streamload(self, table, rows, **kwargs):
+        self.loads.append(list(rows))
+        return self.ok
+
+
+def test_flushes_by_bytes_and_runs_before_once():
+    session = FakeSession()
+    with Pipeline(session, 'meta_partition', flush_bytes=1, before='truncate table meta_partition') as pipeline:
+        for i in range(3):
+            pipeline.put([{'id': i}])
+    assert session.executed == ['truncate table meta_partition']
+    assert pipeline.stats['rows'] == 3
+    assert len(session.loads) == 3
+
+
+def test_nothing_loaded_skips_before():
+    session = FakeSession()
+    with Pipeline(session, 'meta_partition', before='truncate table meta_partition') as pipeline:
+        pipeline.put([])
+    assert session.executed == []
+    assert session.loads == []
+
+
+def test_load_error_is_raised_on_close():
+    session = FakeSession(ok=False)
+    with pytest.raises(Exception, match='streamload error'):
+        with Pipeline(session, 'meta_partition') as pipeline:
+            pipeline.put([{'id': 1}])
@@ -0,0 +1,101 @@
+import pymysql
+import pytest
+from DorisClient import DorisSession
+from DorisClient._Pool import ConnectionPool
+
+
+def test_connections_are_reused_and_bounded(fe):
+    pool = ConnectionPool(['fe1'], max_per_host=2, acquire_timeout=0.05)
+    a = pool.acquire()
+    pool.release(a)
+    assert pool.acquire() is a
+    pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    assert pool.stats()['fe1']['busy'] == 2
+
+
+def test_least_busy_spreads_over_fe(fe):
+    pool = ConnectionPool(['fe1', 'fe2'], max_per_host=2)
+    hosts = [pool.acquire().host for _ in range(4)]
+    assert sorted(hosts) == ['fe1', 'fe1', 'fe2', 'fe2']
+
+
+def test_down_fe_is_skipped(fe):
+    fe.down.add('fe1')
+    pool = ConnectionPool(['fe1', 'fe2'], max_per_host=2)
+    assert {pool.acquire().host for _ in range(2)} == {'fe2'}
+    assert pool.stats()['fe1']['down']
+
+
+def test_connection_error_discards_the_connection(fe):
+    doris = DorisSession(['fe1:8030'], 'db', 'user', 'passwd', mysql_pool_size=1)
+    fe.handler = lambda sql, conn: (_ for _ in ()).throw(pymysql.err.OperationalError(2013, 'Lost connection'))
+    with pytest.raises(pymysql.err.OperationalError):
+        doris.execute('select 1')
+    assert fe.connections[0].closed
+    assert doris.pool.stats()['fe1']['busy'] == 0
+
+
+def test_closed_generator_under_pin_releases_the_connection(fe):
+    doris = DorisSession(['fe1:8030'], 'db', 'user', 'passwd', mysql_pool_size=1)
+
+    def rows():
+        with doris.pin():
+            doris.execute('use other_db')
+            yield 1
+            yield 2
+
+    gen = rows()
+    next(gen)
+    assert doris.pool.stats()['fe1']['busy'] == 1
+    gen.close()
+    assert doris.pool.stats()['fe1']['busy'] == 0
+    assert getattr(doris._local, 'conn', None) is None
+    assert fe.connections[0].db == 'db'  # switched back before reuse
+
+
+def test_interrupt_under_pin_discards_the_connection(fe):
+    doris = DorisSession(['fe1:8030'], 'db', 'user', 'passwd', mysql_pool_size=1)
+    with pytest.raises(KeyboardInterrupt):
+        with doris.pin():
+            raise KeyboardInterrupt
+    assert fe.connections[0].closed
+    assert doris.pool.stats()['fe1']['busy'] == 0 and doris._local.conn is None
+
+
+def test_free_counts_connections_of_fe_up(fe):
+    pool = ConnectionPool(['fe1', 'fe2'], max_per_host=2)
+    pool.hosts[0].down_until = float('inf')
+    pool.acquire()
+    assert pool.free() == 1
+    pool.acquire()
+    assert pool.free() == 0
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.01)
+
+
+def test_use_outside_pin_does_not_leak_to_the_next_statement(fe):
+    doris = DorisSession(['fe1:8030'], 'db', 'user', 'passwd', mysql_pool_size=1)
+    doris.execute('use other_db')
+    conn = fe.connections[0]
+    assert conn.db == 'db' and not conn.closed
+    doris.read('select 1')
+    assert fe.connections == [conn]
+
+
+def test_set_outside_pin_closes_the_connection(fe):
+    doris = DorisSession(['fe1:8030'], 'db', 'user', 'passwd', mysql_pool_size=1)
+    doris.execute('SET enable_profile = true')
+    assert fe.connections[0].closed
+    doris.read('select 1')
+    assert len(fe.connections) == 2
+
+
+def test_use_inside_pin_stays_on_the_connection(fe):
+    doris = DorisSession(['fe1:8030'], 'db', 'user', 'passwd', mysql_pool_size=1)
+    with doris.pin():
+        doris.execute('use other_db')
+        assert fe.connections[0].db is None
+        doris.read('show data')
+    assert fe.connections[0].db == 'db'
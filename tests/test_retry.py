@@ -0,0 +1,89 @@
+import pytest
+import requests
+from DorisClient import Retry, LoadResult
+from conftest import FakeResponse
+
+
+def test_load_result_classification():
+    assert LoadResult(Status='Success')
+    assert LoadResult(Status='Publish Timeout')
+    assert LoadResult(Status='Label Already Exists', ExistingJobStatus='FINISHED')
+    assert not LoadResult(Status='Label Already Exists', ExistingJobStatus='RUNNING')
+    assert not LoadResult(Status='Fail', Message='[DATA_QUALITY_ERROR]too many filtered rows').retryable
+    assert not LoadResult(Status='Fail', Message='errCode = 2, Access denied for user').retryable
+    assert not LoadResult(Status='Fail', Message='Parse json data for JsonDoc failed').retryable
+    assert LoadResult(Status='Fail', Message='failed to parse response of be, timeout').retryable
+    assert LoadResult(Status='HttpError', HttpCode=503).retryable
+    assert not LoadResult(Status='HttpError', HttpCode=401).retryable
+
+
+def test_retry_stops_on_fatal_results_and_retries_errors(no_wait):
+    calls = []
+
+    @Retry(max_retry=3, retry_diff_seconds=0)
+    def load(result):
+        calls.append(1)
+        if len(calls) == 1:
+            raise requests.ConnectionError('down')
+        return result
+
+    assert load(LoadResult(Status='Success')) and len(calls) == 2
+    calls.clear()
+    assert not load(LoadResult(Status='Fail', Message='too many filtered rows')) and len(calls) == 2
+    calls.clear()
+    assert not load(LoadResult(Status='Fail', Message='be busy')) and len(calls) == 4
+
+
+def test_retry_raises_after_max_retry(no_wait):
+    @Retry(max_retry=2, retry_diff_seconds=0)
+    def load():
+        raise requests.Timeout('slow')
+
+    with pytest.raises(requests.Timeout):
+        load()
+
+
+def test_every_retry_reuses_the_label(session, http):
+    responses = iter([FakeResponse(503, 'busy'), None])
+
+    def be(url, headers, body):
+        return next(responses) or {'Status': 'Success'}
+
+    http.be_handler = be
+    result = session.streamload('tb', [{'id': 1}])
+    labels = [call[1]['label'] for call in http.be_calls()]
+    assert result and len(labels) == 2 and labels[0] == labels[1]
+    assert result.client['retries'] == 1
+
+
+def test_empty_input_returns_a_load_result(session, http):
+    result = session.streamload('tb', [])
+    assert isinstance(result, LoadResult) and result and result.loaded_rows == 0
+    assert result.client['retries'] == 0 and http.calls == []
+
+
+def test_deadline_raises_the_last_error():
+    calls = []
+
+    @Retry(max_retry=3, retry_diff_seconds=5, deadline=1)
+    def load():
+        calls.append(1)
+        raise requests.ConnectionError('down')
+
+    with pytest.raises(requests.ConnectionError):
+        load()
+    assert len(calls) == 1
+
+
+def test_fe_outage_is_retried(session, http):
+    put, outage = http.put, [1, 2]
+
+    def flaky(url, *args, **kwargs):
+        if ':8030/' in url and outage:
+            outage.pop()
+            raise requests.ConnectionError('fe down')
+        return put(url, *args, **kwargs)
+
+    http.put = flaky
+    result = session.streamload('tb', [{'id': 1}])
+    assert result and result.client['retries'] == 2
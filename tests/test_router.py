@@ -0,0 +1,44 @@
+import time
+from DorisClient._Router import FeRouter
+from conftest import FakeHttp
+
+
+def test_candidates_rotate_and_put_down_fe_last():
+    router = FeRouter(['fe1:8030', 'fe2:8030', 'fe3:8030'], fail_threshold=2)
+    firsts = {router.candidates()[0] for _ in range(3)}
+    assert firsts == {'fe1:8030', 'fe2:8030', 'fe3:8030'}
+    router.mark_fail('fe2:8030')
+    assert router.down_servers() == []
+    router.mark_fail('fe2:8030')
+    assert router.down_servers() == ['fe2:8030']
+    assert all(router.candidates()[-1] == 'fe2:8030' for _ in range(3))
+    router.mark_ok('fe2:8030')
+    assert router.down_servers() == []
+
+
+def test_location_cache_expires_and_invalidates():
+    router = FeRouter(['fe1:8030'], redirect_ttl=0.05)
+    router.put('tb', 'http://be1:8040/api/db/tb/_stream_load')
+    assert router.get('tb') == 'http://be1:8040/api/db/tb/_stream_load'
+    router.invalidate('tb')
+    assert router.get('tb') is None
+    router.put('tb', 'http://be1:8040/api/db/tb/_stream_load')
+    time.sleep(0.06)
+    assert router.get('tb') is None
+    assert FeRouter(['fe1:8030'], redirect_ttl=0).get('tb') is None
+
+
+def test_single_loads_reuse_the_cached_be(session, http):
+    for _ in range(3):
+        assert session.streamload('tb', [{'id': 1}])
+    fe_calls = [call for call in http.calls if ':8030/' in call[0]]
+    assert len(fe_calls) == 1
+
+
+def test_parallel_chunks_are_spread_across_be(session):
+    http = FakeHttp(bes=['be1:8040', 'be2:8040', 'be3:8040'])
+    session._session = lambda: http
+    summary = session.streamload('tb', [{'id': i} for i in range(6)], chunk_rows=1, max_workers=3)
+    assert summary and summary['chunks'] == 6
+    assert {call[0].split('/')[2] for call in http.be_calls()} == {'be1:8040', 'be2:8040', 'be3:8040'}
+    assert session.router.get('tb') is None
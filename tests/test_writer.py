@@ -0,0 +1,97 @@
+import time
+import threading
+import pytest
+from DorisClient import DorisWriter
+
+
+class FakeSession:
+    """
+    records the batches loaded, `gate` holds every load until it is set
+    """
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.loads = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self._lock = threading.Lock()
+
+    def streamload(self, table, rows, **kwargs):
+        self.gate.wait()
+        time.sleep(self.delay)
+        with self._lock:
+            self.loads.append((table, [row['id'] for row in rows]))
+        return True
+
+
+def test_flush_by_rows_and_on_close():
+    session = FakeSession()
+    with DorisWriter(session, max_rows=3, max_age=60) as writer:
+        writer.write_many('tb', [{'id': i} for i in range(7)])
+    assert sorted(session.loads) == [('tb', [0, 1, 2]), ('tb', [3, 4, 5]), ('tb', [6])]
+    assert writer.stats['rows'] == 7 and writer.stats['flushes'] == 3
+
+
+def test_flush_by_bytes():
+    session = FakeSession()
+    with DorisWriter(session, max_bytes=30, max_age=60) as writer:
+        writer.write_many('tb', [{'id': i, 'name': 'x' * 10} for i in range(4)])
+        writer.flush()
+        assert len(session.loads) >= 2
+
+
+def test_flush_by_age():
+    session = FakeSession()
+    writer = DorisWriter(session, max_age=0.1)
+    writer.write('tb', {'id': 1})
+    deadline = time.monotonic() + 5
+    while not session.loads and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert session.loads == [('tb', [1])]
+    writer.close()
+
+
+def test_write_blocks_while_the_buffer_is_full():
+    session = FakeSession()
+    session.gate.clear()
+    writer = DorisWriter(session, max_rows=1, max_buffer_bytes=1, write_timeout=0.1, max_age=60)
+    writer.write('tb', {'id': 1})
+    with pytest.raises(TimeoutError):
+        writer.write('tb', {'id': 2})
+    session.gate.set()
+    writer.close()
+    assert session.loads == [('tb', [1])]
+
+
+def test_batches_of_a_table_are_loaded_in_order():
+    session = FakeSession(delay=0.01)
+    with DorisWriter(session, max_rows=2, workers=4, max_age=60) as writer:
+        writer.write_many('tb', [{'id': i} for i in range(10)])
+    assert [ids for _, ids in session.loads] == [[0, 1], [2, 3], [4, 5], [6, 7], [8, 9]]
+
+
+def test_write_after_close_raises_and_close_loads_everything():
+    session = FakeSession()
+    writer = DorisWriter(session, max_age=60)
+    stop = threading.Event()
+    written = []
+
+    def produce():
+        i = 0
+        while not stop.is_set():
+            try:
+                writer.write('tb', {'id': i})
+            except Exception:
+                return
+            written.append(i)
+            i += 1
+
+    thread = threading.Thread(target=produce)
+    thread.start()
+    time.sleep(0.02)
+    writer.close()
+    stop.set()
+    thread.join()
+    with pytest.raises(Exception, match='closed'):
+        writer.write('tb', {'id': -1})
+    assert sorted(i for _, ids in session.loads for i in ids) == written